@@ -0,0 +1,887 @@
+"""
+Accelerated assignment engines for k-Means clustering
+
+An engine labels each point of a dataset with its nearest centroid, as
+Algorithm._partition does, but remembers bounds on the distances between calls.
+Since most points stay in the same cluster after the first few steps, the
+bounds (and the triangle inequality) rule out most of the distances without
+computing them. The labels are exactly those of Algorithm._partition, including
+ties going to the first cluster.
+"""
+
+import math
+import numpy
+
+# For accessing the previous parts of the assignment
+import a6cluster
+import a6kdtree
+
+# The rounding allowance of the bounds, in units of the machine epsilon of the
+# dataset (times the scale of the points and centroids)
+MARGIN = 64
+
+# The average number of centroids in each group of the Yinyang engine
+GROUP_SIZE = 10
+
+# The most dimensions for which the kd-tree engine pays off (the boxes of the
+# nodes are too large to filter much in more dimensions)
+FILTER_DIMENSION = 4
+
+
+# HELPERS TO MEASURE DISTANCES
+def paired_distances(rows, centroids, labels):
+    """
+    Returns a 1D numpy array of the squared distance from each row to its centroid.
+
+    Entry i is the squared distance from rows[i] to centroids[labels[i]], computed
+    from the differences as a6cluster.exact_distances does (so it is a float64
+    array, and equal distances are exactly equal).
+
+    Parameter rows: the points to measure
+    Precondition: rows is a 2D numpy array of floats
+
+    Parameter centroids: the centroids to measure to
+    Precondition: centroids is a 2D numpy array of the same number type as rows
+
+    Parameter labels: the centroid of each row
+    Precondition: labels is a 1D numpy array of ints, one for each row
+    """
+    return a6cluster.squared_distances(rows, centroids[labels])
+
+
+def lower_distances(rows, centroids, norms, centroid_norms):
+    """
+    Returns a 2D numpy array of lower bounds on the distance from each row to each centroid.
+
+    The bounds come from expanding the squared distances (as in
+    a6cluster.nearest_centroids), less the largest possible rounding error, so
+    they take one matrix product. They are very close to the distances, except
+    for the ones that are almost 0.
+
+    Parameter rows: the points to measure
+    Precondition: rows is a 2D numpy array of floats
+
+    Parameter centroids: the centroids to measure to
+    Precondition: centroids is a 2D numpy array of the same number type as rows
+
+    Parameter norms: the squared length of each row
+    Precondition: norms is the 1D numpy array a6cluster.row_norms(rows)
+
+    Parameter centroid_norms: the squared length of each centroid
+    Precondition: centroid_norms is the 1D numpy array a6cluster.row_norms(centroids)
+    """
+    dist = rows @ centroids.T
+    dist *= -2
+    dist += centroid_norms
+    dist += norms[:, None]
+    # As in nearest_centroids, with room for the float64 sums of the exact distances
+    dim = rows.shape[1]
+    slack = 2 * (dim + 4) * numpy.finfo(rows.dtype).eps + 4 * (dim + 2) * numpy.finfo(float).eps
+    dist -= (slack * (norms + centroid_norms.max()))[:, None]
+    numpy.maximum(dist, 0, out=dist)
+    return numpy.sqrt(dist, out=dist)
+
+
+def nearest_two(rows, centroids, norms, centroid_norms):
+    """
+    Returns a tuple (labels, best, second) for the two nearest centroids to each row.
+
+    The labels are those of a6cluster.nearest_centroids (ties go to the first
+    centroid), best is the exact squared distance from each row to the centroid
+    of its label (see paired_distances), and second is a lower bound on the
+    distance from each row to every other centroid (see lower_distances). All
+    three are 1D numpy arrays with an entry for each row.
+
+    Parameter rows: the points to measure
+    Precondition: rows is a 2D numpy array of floats
+
+    Parameter centroids: the centroids to measure to
+    Precondition: centroids is a 2D numpy array of the same number type as rows
+
+    Parameter norms: the squared length of each row
+    Precondition: norms is the 1D numpy array a6cluster.row_norms(rows)
+
+    Parameter centroid_norms: the squared length of each centroid
+    Precondition: centroid_norms is the 1D numpy array a6cluster.row_norms(centroids)
+    """
+    labels, _ = a6cluster.nearest_centroids(rows, centroids, norms, centroid_norms)
+    best = paired_distances(rows, centroids, labels)
+    if len(centroids) == 1:
+        return labels, best, numpy.full(len(rows), numpy.inf, dtype=rows.dtype)
+    dist = lower_distances(rows, centroids, norms, centroid_norms)
+    dist[numpy.arange(len(rows)), labels] = numpy.inf
+    return labels, best, dist.min(axis=1)
+
+
+def other_lower(dist, labels):
+    """
+    Returns a 1D numpy array of the smallest distance from each row to another centroid.
+
+    Entry i is the smallest entry of dist[i] other than dist[i,labels[i]], or
+    infinity if there is only one centroid. The array dist is not changed.
+
+    Parameter dist: the (bounds on the) distances from each row to each centroid
+    Precondition: dist is a 2D numpy array of floats with a column for each centroid
+
+    Parameter labels: the centroid of each row
+    Precondition: labels is a 1D numpy array of ints, one for each row of dist
+    """
+    if dist.shape[1] == 1:
+        return numpy.full(len(dist), numpy.inf, dtype=dist.dtype)
+    dist = dist.copy()
+    dist[numpy.arange(len(dist)), labels] = numpy.inf
+    return dist.min(axis=1)
+
+
+def other_drifts(drift):
+    """
+    Returns a 1D numpy array of the largest drift of any other centroid.
+
+    Entry j is the largest entry of drift other than drift[j] (or 0 if there is
+    only one centroid). Every centroid but the one that moved most gets the
+    largest drift.
+
+    Parameter drift: how far each centroid moved
+    Precondition: drift is a 1D numpy array of floats >= 0
+    """
+    order = numpy.argsort(drift)
+    result = numpy.full(len(drift), drift[order[-1]])
+    result[order[-1]] = drift[order[-2]] if len(order) > 1 else 0
+    return result
+
+
+def centroid_distances(centroids):
+    """
+    Returns a 2D float64 numpy array of the distances between the centroids.
+
+    Entry [i,j] is the distance from centroids[i] to centroids[j].
+
+    Parameter centroids: the centroids to measure
+    Precondition: centroids is a 2D numpy array of floats
+    """
+    centroids = numpy.asarray(centroids, dtype=numpy.float64)
+    result = a6cluster.exact_distances(centroids, centroids)
+    return numpy.sqrt(result, out=result)
+
+
+def group_centroids(centroids, count, steps=5):
+    """
+    Returns a 1D numpy intp array of the group of each centroid.
+
+    The centroids are grouped by clustering them (with a few steps of k-means,
+    starting from evenly spaced centroids), so that the centroids in a group are
+    near each other. Groups that end up empty are dropped, so the groups are
+    numbered 0 to (at most) count-1, with no gaps.
+
+    Parameter centroids: the centroids to group
+    Precondition: centroids is a 2D numpy array with at least count rows
+
+    Parameter count: the number of groups
+    Precondition: count is an int > 0
+
+    Parameter steps: the number of steps of k-means
+    Precondition: steps is an int >= 0
+    """
+    centroids = numpy.asarray(centroids, dtype=numpy.float64)
+    centers = centroids[numpy.linspace(0, len(centroids) - 1, count).astype(int)]
+    group = numpy.zeros(len(centroids), dtype=numpy.intp)
+    for step in range(steps + 1):
+        group, _ = a6cluster.nearest_centroids(centroids, centers)
+        sizes = numpy.bincount(group, minlength=count)
+        sums = numpy.zeros(centers.shape)
+        numpy.add.at(sums, group, centroids)
+        nonempty = sizes > 0
+        centers[nonempty] = sums[nonempty] / sizes[nonempty, None]
+    return numpy.unique(group, return_inverse=True)[1].reshape(-1)
+
+
+# THE ENGINES
+class Engine(object):
+    """
+    A class representing an assignment engine, which labels points with their nearest centroid.
+
+    This is the part shared by all the engines. The first call labels every point
+    by measuring all the distances. After that, each subclass uses its own
+    bounds to skip the distances that cannot change the labels.
+
+    To label the points, call start once with the current centroids, and then
+    label for each block of the dataset (as in Dataset.chunks), in any order.
+    """
+    # Attribute _dtype: The number type of the dataset
+    # Invariant: _dtype is one of a6dataset.DTYPES
+    #
+    # Attribute _labels: The label of each point at the last call to label
+    # Invariant: _labels is a 1D numpy intp array with one entry for each point
+    #
+    # Attribute _upper: An upper bound on the distance from each point to its centroid
+    # Invariant: _upper is a 1D numpy array (of type _dtype) the same length as _labels
+    #
+    # Attribute _centroids: The centroids at the last call to start
+    # Invariant: _centroids is None (before the first call) or a 2D numpy array
+    # (of type _dtype) with one row for each centroid
+    #
+    # Attribute _norms: The squared length of each centroid in _centroids
+    # Invariant: _norms is None if _centroids is None. Otherwise it is the 1D
+    # numpy array a6cluster.row_norms(_centroids).
+    #
+    # Attribute _drift: How far each centroid moved at the last call to start
+    # Invariant: _drift is None if the bounds have not been set yet. Otherwise it
+    # is a 1D numpy array (of type _dtype) with one entry for each centroid.
+    #
+    # Attribute _margin: The rounding allowance of the bounds
+    # Invariant: _margin is a float >= 0
+    #
+    # Attribute _count: The number of point-to-centroid distances computed
+    # Invariant: _count is an int >= 0
+
+    def getSize(self):
+        """
+        Returns the number of points this engine labels.
+        """
+        return len(self._labels)
+
+    def getCount(self):
+        """
+        Returns the number of point-to-centroid distances computed so far.
+
+        This is the work that the bounds are meant to save. Algorithm._partition
+        computes getSize() times (the number of centroids) on every call.
+        """
+        return self._count
+
+    def __init__(self, dset):
+        """
+        Initializes a new engine for the points of the given dataset.
+
+        Parameter dset: the dataset to label
+        Precondition: dset is a Dataset. Its size must not change while this
+        engine is in use.
+        """
+        self._dtype = dset.getDtype()
+        self._labels = numpy.zeros(dset.getSize(), dtype=numpy.intp)
+        self._upper = numpy.zeros(dset.getSize(), dtype=self._dtype)
+        self._centroids = None
+        self._norms = None
+        self._drift = None
+        self._margin = 0.0
+        self._count = 0
+
+    def start(self, centroids, norms):
+        """
+        Prepares to label the points with the given centroids.
+
+        This measures how far each centroid has moved since the last call, which
+        is how much the bounds must be loosened.
+
+        Parameter centroids: the centroids to label the points with
+        Precondition: centroids is a 2D numpy array with one row for each
+        centroid. The number of centroids must not change between calls.
+
+        Parameter norms: the squared length of each point
+        Precondition: norms is a 1D numpy array with one entry for each point
+        """
+        centroids = numpy.array(centroids, dtype=self._dtype)
+        if self._centroids is not None:
+            diff = centroids.astype(numpy.float64) - self._centroids
+            self._drift = numpy.sqrt(numpy.einsum('ij,ij->i', diff, diff)).astype(self._dtype)
+        self._centroids = centroids
+        self._norms = a6cluster.row_norms(centroids)
+
+        # Rounding errors grow with the size of the numbers involved
+        scale = math.sqrt(float(self._norms.max()))
+        if len(norms):
+            scale += math.sqrt(float(norms.max()))
+        self._margin = MARGIN * float(numpy.finfo(self._dtype).eps) * scale
+        self._prepare()
+
+    def label(self, start, rows, norms):
+        """
+        Returns a 1D numpy array of the label of each point in a block.
+
+        The array may share memory with this engine, so it should be copied (or
+        used) before the next call.
+
+        Parameter start: the index of the first point in the block
+        Precondition: start is an int >= 0
+
+        Parameter rows: the points in the block
+        Precondition: rows is a 2D numpy array, the rows start..start+len(rows)-1
+        of the dataset
+
+        Parameter norms: the squared length of each point in the block
+        Precondition: norms is a 1D numpy array with one entry for each row
+        """
+        span = slice(start, start + len(rows))
+        if self._drift is None:
+            # Measure everything, as _partition does, and set the bounds
+            cnorms = self._norms
+            labels, _ = a6cluster.nearest_centroids(rows, self._centroids, norms, cnorms)
+            self._count += len(rows) * len(self._centroids)
+            self._labels[span] = labels
+            self._upper[span] = numpy.sqrt(paired_distances(rows, self._centroids, labels))
+            self._initialize(span, rows, lower_distances(rows, self._centroids, norms, cnorms))
+        else:
+            self._filter(span, rows, norms)
+        return self._labels[span]
+
+    def _prepare(self):
+        """
+        Computes what the subclass needs from the centroids before labeling.
+
+        By default, it does nothing.
+        """
+        pass
+
+    def _initialize(self, span, rows, dist):
+        """
+        Sets the bounds of a block of points from lower bounds on all their distances.
+
+        By default, it does nothing.
+
+        Parameter span: the indices of the points
+        Precondition: span is a slice
+
+        Parameter rows: the points in the block
+        Precondition: rows is a 2D numpy array
+
+        Parameter dist: a lower bound on the distance from each point to each centroid
+        Precondition: dist is a 2D numpy array with one row for each point
+        """
+        pass
+
+    def _filter(self, span, rows, norms):
+        """
+        Updates the labels (and bounds) of a block of points.
+
+        Parameter span: the indices of the points
+        Precondition: span is a slice
+
+        Parameter rows: the points in the block
+        Precondition: rows is a 2D numpy array
+
+        Parameter norms: the squared length of each point in the block
+        Precondition: norms is a 1D numpy array with one entry for each row
+        """
+        raise NotImplementedError('Subclasses must implement _filter')
+
+
+class Elkan(Engine):
+    """
+    A class representing Elkan's accelerated assignment.
+
+    Each point keeps an upper bound on the distance to its centroid, a lower
+    bound on the distance to every centroid, and (as in Hamerly) the smallest of
+    those lower bounds. When the centroids move, the bounds are loosened by how
+    far they moved. A point is settled by the single bound, if possible, and
+    otherwise by its lower bound for each centroid (or half the distance between
+    the two centroids). Only the points that the bounds cannot settle are
+    measured against every centroid, with one matrix product.
+
+    The lower bounds for each centroid are only loosened when a point needs
+    them, since that takes one number for each point and centroid. Until then,
+    the engine remembers how far each centroid moved in total, and the step
+    when the bounds of each point were last loosened.
+
+    The lower bounds take one number for each point and centroid (n*k in all).
+    This computes the fewest distances of the bounds engines, but in numpy,
+    checking the bounds costs about as much as the matrix products that it
+    skips. So it is usually no faster than the 'lloyd' mode in time, and
+    Hamerly (with two bounds for each point) is usually faster than this.
+    """
+    # Attribute _lower: The lower bounds on the distances, as of step _stamp
+    # Invariant: _lower is a 2D numpy array (of type _dtype) with a row for each
+    # point and a column for each centroid. Row i, less _moved[-1]-_moved[j] for
+    # j = _stamp[i], is a lower bound on the distance from point i to each centroid.
+    #
+    # Attribute _stamp: The step when the lower bounds of each point were set
+    # Invariant: _stamp is a 1D numpy intp array with an entry for each point,
+    # each an index of _moved
+    #
+    # Attribute _moved: How far each centroid moved in total, at each step
+    # Invariant: _moved is a 2D float64 numpy array with a row for each call to
+    # start and a column for each centroid. Entry [j,c] is the total of _drift
+    # (plus the margin) for centroid c up to call j, so row 0 is all zeros.
+    #
+    # Attribute _least: A lower bound on the distance to every other centroid
+    # Invariant: _least is a 1D numpy array (of type _dtype) with an entry for
+    # each point
+    #
+    # Attribute _half: Half the distances between the centroids (less the margin)
+    # Invariant: _half is a 2D numpy array (of type _dtype) with a row and a
+    # column for each centroid
+    #
+    # Attribute _nearest: The smallest entry of _half for another centroid
+    # Invariant: _nearest is a 1D numpy array (of type _dtype) with an entry for
+    # each centroid
+    #
+    # Attribute _others: The largest drift of any other centroid
+    # Invariant: _others is None if _drift is None. Otherwise it is the 1D numpy
+    # array other_drifts(_drift).
+
+    def __init__(self, dset, k):
+        """
+        Initializes a new Elkan engine for the points of the given dataset.
+
+        Parameter dset: the dataset to label
+        Precondition: dset is a Dataset. Its size must not change while this
+        engine is in use.
+
+        Parameter k: the number of centroids
+        Precondition: k is an int > 0
+        """
+        super().__init__(dset)
+        self._lower = numpy.zeros((dset.getSize(), k), dtype=self._dtype)
+        self._stamp = numpy.zeros(dset.getSize(), dtype=numpy.intp)
+        self._moved = numpy.zeros((1, k))
+        self._least = numpy.zeros(dset.getSize(), dtype=self._dtype)
+        self._half = None
+        self._nearest = None
+        self._others = None
+
+    def _prepare(self):
+        """
+        Computes half the distances between the centroids, and how far they moved.
+        """
+        half = centroid_distances(self._centroids) / 2 - self._margin
+        numpy.fill_diagonal(half, numpy.inf)
+        self._nearest = half.min(axis=1).astype(self._dtype)
+        self._half = half.astype(self._dtype)
+
+        if self._drift is not None:
+            self._moved = numpy.vstack((self._moved, self._moved[-1] + self._drift + self._margin))
+            self._others = other_drifts(self._drift)
+
+    def _initialize(self, span, rows, dist):
+        """
+        Sets the lower bounds of a block of points to their distances.
+        """
+        self._lower[span] = dist
+        self._stamp[span] = len(self._moved) - 1
+        self._least[span] = other_lower(dist, self._labels[span])
+
+    def _filter(self, span, rows, norms):
+        """
+        Updates the labels (and bounds) of a block of points.
+        """
+        labels = self._labels[span]
+        upper = self._upper[span]
+        least = self._least[span]
+
+        # Loosen the bounds by how far the centroids moved
+        upper += self._drift[labels] + self._margin
+        least -= self._others[labels] + self._margin
+
+        # A point is settled if it is nearer its centroid than either bound
+        limit = numpy.maximum(self._nearest[labels], least)
+        active = numpy.flatnonzero(upper >= limit)
+        if len(active) == 0:
+            return
+        label = labels[active]
+        bound = numpy.sqrt(paired_distances(rows[active], self._centroids, label))
+        self._count += len(active)
+        upper[active] = bound
+        keep = bound >= limit[active]
+        active, label, bound = active[keep], label[keep], bound[keep]
+        if len(active) == 0:
+            return
+
+        # Or if every other centroid is beyond its own lower bound or half way
+        now = len(self._moved) - 1
+        points = span.start + active
+        loosen = (self._moved[now] - self._moved).astype(self._dtype)
+        lower = self._lower[points]
+        lower -= loosen[self._stamp[points]]
+        lower[numpy.arange(len(active)), label] = bound
+        settled = (bound[:, None] < numpy.maximum(lower, self._half[label])).all(axis=1)
+        self._lower[points] = lower
+        self._stamp[points] = now
+        least[active[settled]] = other_lower(lower[settled], label[settled])
+        active = active[~settled]
+        if len(active) == 0:
+            return
+
+        # Measure the rest against every centroid, as in the first step
+        sub = rows[active]
+        label, _ = a6cluster.nearest_centroids(sub, self._centroids, norms[active], self._norms)
+        self._count += len(active) * len(self._centroids)
+        labels[active] = label
+        upper[active] = numpy.sqrt(paired_distances(sub, self._centroids, label))
+        lower = lower_distances(sub, self._centroids, norms[active], self._norms)
+        self._lower[span.start + active] = lower
+        least[active] = other_lower(lower, label)
+
+
+class Hamerly(Engine):
+    """
+    A class representing Hamerly's accelerated assignment.
+
+    Each point keeps an upper bound on the distance to its centroid, and a single
+    lower bound on the distance to every other centroid. When the centroids
+    move, the lower bound is loosened by the largest distance that any other
+    centroid moved. A point is only measured again when its upper bound is not
+    less than both its lower bound and half the distance from its centroid to
+    the nearest other centroid.
+
+    The bounds take two numbers for each point, so this is best for data with
+    few dimensions (where Elkan's bounds cost more than the distances).
+    """
+    # Attribute _lower: The lower bound on the distance to every other centroid
+    # Invariant: _lower is a 1D numpy array (of type _dtype) with an entry for
+    # each point
+    #
+    # Attribute _nearest: Half the distance from each centroid to the nearest
+    # other centroid (less the margin)
+    # Invariant: _nearest is a 1D numpy array (of type _dtype) with an entry for
+    # each centroid
+    #
+    # Attribute _others: The largest drift of any other centroid
+    # Invariant: _others is None if _drift is None. Otherwise it is the 1D numpy
+    # array other_drifts(_drift).
+
+    def __init__(self, dset, k):
+        """
+        Initializes a new Hamerly engine for the points of the given dataset.
+
+        Parameter dset: the dataset to label
+        Precondition: dset is a Dataset. Its size must not change while this
+        engine is in use.
+
+        Parameter k: the number of centroids
+        Precondition: k is an int > 0
+        """
+        super().__init__(dset)
+        self._lower = numpy.zeros(dset.getSize(), dtype=self._dtype)
+        self._nearest = None
+        self._others = None
+
+    def _prepare(self):
+        """
+        Computes the nearest other centroid and the largest drift of the others.
+        """
+        half = centroid_distances(self._centroids) / 2 - self._margin
+        numpy.fill_diagonal(half, numpy.inf)
+        self._nearest = half.min(axis=1).astype(self._dtype)
+
+        if self._drift is not None:
+            self._others = other_drifts(self._drift)
+
+    def _initialize(self, span, rows, dist):
+        """
+        Sets the lower bounds of a block of points to their second smallest distance.
+        """
+        self._lower[span] = other_lower(dist, self._labels[span])
+
+    def _filter(self, span, rows, norms):
+        """
+        Updates the labels (and bounds) of a block of points.
+        """
+        labels = self._labels[span]
+        upper = self._upper[span]
+        lower = self._lower[span]
+
+        # Loosen the bounds by how far the centroids moved
+        upper += self._drift[labels] + self._margin
+        lower -= self._others[labels] + self._margin
+
+        # A point is settled if it is nearer its centroid than either bound
+        limit = numpy.maximum(self._nearest[labels], lower)
+        active = numpy.flatnonzero(upper >= limit)
+        if len(active) == 0:
+            return
+        best = paired_distances(rows[active], self._centroids, labels[active])
+        self._count += len(active)
+        upper[active] = numpy.sqrt(best)
+        active = active[upper[active] >= limit[active]]
+        if len(active) == 0:
+            return
+
+        # Measure the rest against every centroid, as in the first step
+        label, best, second = nearest_two(rows[active], self._centroids, norms[active],
+                                          self._norms)
+        self._count += len(active) * len(self._centroids)
+        labels[active] = label
+        upper[active] = numpy.sqrt(best)
+        lower[active] = second
+
+
+class Yinyang(Engine):
+    """
+    A class representing the Yinyang (group filtering) assignment.
+
+    The centroids are split into groups of nearby centroids once, at the first
+    step (see group_centroids). Each point keeps an upper bound on the distance
+    to its centroid, and a lower bound on the distance to the centroids of each
+    group (other than its own centroid). When the centroids move, the lower bound
+    of a group is loosened by the largest distance that a centroid of the group
+    moved. A point is skipped if its upper bound is less than all of its lower
+    bounds. Otherwise, only the groups whose lower bound it reaches are measured.
+
+    The bounds take about one number for each point and GROUP_SIZE centroids,
+    so this is best for large numbers of centroids.
+    """
+    # Attribute _count_groups: The number of groups to ask for
+    # Invariant: _count_groups is an int > 0
+    #
+    # Attribute _group: The group of each centroid
+    # Invariant: _group is None (before the first step) or a 1D numpy intp array
+    # with an entry for each centroid
+    #
+    # Attribute _members: The centroids in each group
+    # Invariant: _members is None if _group is None. Otherwise it is a list with a
+    # 1D numpy intp array for each group, of the centroids in it (in order).
+    #
+    # Attribute _lower: The lower bounds for each group
+    # Invariant: _lower is None if _group is None. Otherwise it is a 2D numpy
+    # array (of type _dtype) with a row for each point and a column for each
+    # group. Entry [i,g] is a lower bound on the distance from point i to every
+    # centroid of group g, other than the centroid of point i.
+    #
+    # Attribute _spread: The largest drift of a centroid in each group
+    # Invariant: _spread is None if _drift is None. Otherwise it is a 1D numpy
+    # array (of type _dtype) with an entry for each group.
+
+    def __init__(self, dset, k):
+        """
+        Initializes a new Yinyang engine for the points of the given dataset.
+
+        Parameter dset: the dataset to label
+        Precondition: dset is a Dataset. Its size must not change while this
+        engine is in use.
+
+        Parameter k: the number of centroids
+        Precondition: k is an int > 0
+        """
+        super().__init__(dset)
+        self._count_groups = max(1, k // GROUP_SIZE)
+        self._group = None
+        self._members = None
+        self._lower = None
+        self._spread = None
+
+    def _prepare(self):
+        """
+        Groups the centroids (at the first step) and finds the drift of each group.
+        """
+        if self._group is None:
+            self._group = group_centroids(self._centroids, self._count_groups)
+            order = numpy.argsort(self._group, kind='stable')
+            bounds = numpy.cumsum(numpy.bincount(self._group))
+            self._members = numpy.split(order, bounds[:-1])
+            self._lower = numpy.zeros((self.getSize(), len(self._members)), dtype=self._dtype)
+
+        if self._drift is not None:
+            self._spread = numpy.array([self._drift[m].max() for m in self._members],
+                                       dtype=self._dtype)
+
+    def _initialize(self, span, rows, dist):
+        """
+        Sets the lower bounds of a block of points to the nearest centroid of each group.
+        """
+        dist[numpy.arange(len(rows)), self._labels[span]] = numpy.inf
+        lower = self._lower[span]
+        for g in range(len(self._members)):
+            lower[:, g] = dist[:, self._members[g]].min(axis=1)
+
+    def _filter(self, span, rows, norms):
+        """
+        Updates the labels (and bounds) of a block of points.
+        """
+        labels = self._labels[span]
+        upper = self._upper[span]
+        lower = self._lower[span]
+
+        # Loosen the bounds by how far the centroids moved
+        upper += self._drift[labels] + self._margin
+        lower -= self._spread + self._margin
+
+        # A point is settled if it is nearer its centroid than every group
+        least = lower.min(axis=1)
+        active = numpy.flatnonzero(upper >= least)
+        if len(active) == 0:
+            return
+        label = labels[active]
+        best = paired_distances(rows[active], self._centroids, label)
+        self._count += len(active)
+        bound = numpy.sqrt(best)
+        upper[active] = bound
+        keep = bound >= least[active]
+        active, label, best, bound = active[keep], label[keep], best[keep], bound[keep]
+        if len(active) == 0:
+            return
+
+        # Points that must search most groups are measured against every centroid
+        search = bound[:, None] >= lower[active]
+        full = search.sum(axis=1) * 2 > len(self._members)
+        if full.any():
+            self._measure(span, rows, norms, active[full])
+            active, label, best, bound = (active[~full], label[~full], best[~full],
+                                          bound[~full])
+            search = search[~full]
+
+        # Measure the groups that the bounds do not rule out
+        sub = rows[active]
+        subnorms = norms[active]
+        bounds = lower[active]
+        first = numpy.empty(bounds.shape, dtype=self._dtype)
+        second = numpy.empty(bounds.shape, dtype=self._dtype)
+        nearest = numpy.empty(bounds.shape, dtype=numpy.intp)
+        found = label.copy()
+        for g in range(len(self._members)):
+            pos = numpy.flatnonzero(search[:, g])
+            if len(pos) == 0:
+                continue
+            # The nearest centroid of the group (the first, if tied) and the next
+            members = self._members[g]
+            cents = self._centroids[members]
+            index, near, next = nearest_two(sub[pos], cents, subnorms[pos],
+                                            a6cluster.row_norms(cents))
+            self._count += len(pos) * len(members)
+            first[pos, g] = numpy.sqrt(near)
+            second[pos, g] = next
+            nearest[pos, g] = members[index]
+
+            # Compare the roots, and ties go to the first centroid, as in _partition
+            index = members[index]
+            root, old = numpy.sqrt(near), numpy.sqrt(best[pos])
+            closer = (root < old) | ((root == old) & (index < found[pos]))
+            found[pos[closer]] = index[closer]
+            best[pos[closer]] = near[closer]
+
+        # The new bound of a measured group leaves out the new centroid
+        bounds[search] = numpy.where(nearest == found[:, None], second, first)[search]
+
+        # The old centroid of a point that moved is now in its group's bound
+        moved = numpy.flatnonzero(found != label)
+        old = self._group[label[moved]]
+        bounds[moved, old] = numpy.minimum(bounds[moved, old], bound[moved])
+
+        lower[active] = bounds
+        labels[active] = found
+        upper[active] = numpy.sqrt(best)
+
+    def _measure(self, span, rows, norms, active):
+        """
+        Labels some points of a block (and sets their bounds) as in the first step.
+
+        Parameter span: the indices of the points in the block
+        Precondition: span is a slice
+
+        Parameter rows: the points in the block
+        Precondition: rows is a 2D numpy array
+
+        Parameter norms: the squared length of each point in the block
+        Precondition: norms is a 1D numpy array with one entry for each row
+
+        Parameter active: the positions (in rows) of the points to label
+        Precondition: active is a 1D numpy array of ints
+        """
+        sub = rows[active]
+        cnorms = self._norms
+        label, _ = a6cluster.nearest_centroids(sub, self._centroids, norms[active], cnorms)
+        self._count += len(active) * len(self._centroids)
+        self._labels[span][active] = label
+        self._upper[span][active] = numpy.sqrt(paired_distances(sub, self._centroids, label))
+
+        dist = lower_distances(sub, self._centroids, norms[active], cnorms)
+        dist[numpy.arange(len(active)), label] = numpy.inf
+        for g in range(len(self._members)):
+            self._lower[span.start + active, g] = dist[:, self._members[g]].min(axis=1)
+
+
+class Filter(object):
+    """
+    A class representing the kd-tree filtering assignment.
+
+    A kd-tree is built over the dataset at the first step, and reused after that
+    (see a6kdtree.KDTree). On each step, the centroids are pushed down the tree,
+    and the ones that cannot be nearest to any point in a node are filtered out,
+    so whole subtrees are labeled without measuring their points. This needs no
+    bounds between steps, only the tree.
+
+    This is best for data with few dimensions (up to FILTER_DIMENSION) and many
+    centroids, where the boxes of the nodes are small. With more dimensions,
+    far fewer centroids are filtered out, and measuring the rest costs more than
+    the matrix products of the 'lloyd' mode.
+    """
+    # Attribute _dataset: The dataset to label
+    # Invariant: _dataset is a Dataset
+    #
+    # Attribute _tree: The kd-tree over the dataset
+    # Invariant: _tree is None (before the first step) or a KDTree
+    #
+    # Attribute _labels: The label of each point at the last call to start
+    # Invariant: _labels is a 1D numpy intp array with one entry for each point
+    #
+    # Attribute _count: The number of point-to-centroid distances computed
+    # Invariant: _count is an int >= 0
+
+    def getSize(self):
+        """
+        Returns the number of points this engine labels.
+        """
+        return len(self._labels)
+
+    def getCount(self):
+        """
+        Returns the number of point-to-centroid distances computed so far.
+        """
+        return self._count
+
+    def __init__(self, dset, k):
+        """
+        Initializes a new filtering engine for the points of the given dataset.
+
+        Parameter dset: the dataset to label
+        Precondition: dset is a non-empty Dataset. It must not change while this
+        engine is in use.
+
+        Parameter k: the number of centroids
+        Precondition: k is an int > 0
+        """
+        self._dataset = dset
+        self._tree = None
+        self._labels = numpy.zeros(dset.getSize(), dtype=numpy.intp)
+        self._count = 0
+
+    def start(self, centroids, norms):
+        """
+        Labels all the points with the given centroids.
+
+        Parameter centroids: the centroids to label the points with
+        Precondition: centroids is a 2D numpy array with one row for each centroid
+
+        Parameter norms: the squared length of each point
+        Precondition: norms is a 1D numpy array with one entry for each point
+        """
+        if self._tree is None:
+            self._tree = a6kdtree.KDTree(self._dataset)
+        dtype = self._dataset.getDtype()
+        centroids = numpy.array(centroids, dtype=dtype)
+
+        # The margin is in squared distance
+        scale = math.sqrt(float(a6cluster.row_norms(centroids).max()))
+        scale += math.sqrt(float(norms.max()))
+        margin = MARGIN * float(numpy.finfo(dtype).eps) * scale * scale
+        self._count += self._tree.filter(centroids, self._labels, margin)
+
+    def label(self, start, rows, norms):
+        """
+        Returns a 1D numpy array of the label of each point in a block.
+
+        The labels were all found by start, so this just looks them up.
+
+        Parameter start: the index of the first point in the block
+        Precondition: start is an int >= 0
+
+        Parameter rows: the points in the block
+        Precondition: rows is a 2D numpy array, the rows start..start+len(rows)-1
+        of the dataset
+
+        Parameter norms: the squared length of each point in the block
+        Precondition: norms is a 1D numpy array with one entry for each row
+        """
+        return self._labels[start:start + len(rows)]
+
+
+# The engines that Algorithm can use, by mode
+ENGINES = {'elkan': Elkan, 'hamerly': Hamerly, 'yinyang': Yinyang, 'kdtree': Filter}
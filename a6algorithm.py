@@ -6,12 +6,30 @@ Date: November 15th, 2024
 """
 
 import math
-import random
 import numpy
 
 # For accessing the previous parts of the assignment
 import a6dataset
 import a6cluster
+import a6accel
+
+# The default bound on the memory used to label a block of points (in bytes).
+# Each point of a block needs a distance to every centroid.
+MAX_MEMORY = 1 << 26
+
+# The ways that _partition can label the points. 'lloyd' measures every distance
+# on every step; the others are the engines of a6accel, which skip most of them.
+MODES = ('lloyd',) + tuple(a6accel.ENGINES)
+
+# The number of steps without improvement after which run_minibatch stops
+PATIENCE = 10
+
+# The ways to choose the initial centroids when no seeds are given
+INITS = ('random', 'k-means++', 'k-means||')
+
+# The number of rounds of k-means||, and the points it samples in each (per cluster)
+ROUNDS = 5
+OVERSAMPLE = 2
 
 # TASK 3: ALGORITHM
 
@@ -53,6 +71,156 @@ def valid_seeds(value, size):
     return True
 
 
+def _closer(dset, center, closest):
+    """
+    Lowers each entry of closest to the squared distance from its point to center.
+
+    The points are measured a block at a time, from the differences.
+
+    Parameter dset: the dataset
+    Precondition: dset is a Dataset
+
+    Parameter center: the new centroid
+    Precondition: center is a 1D numpy array of getDimension() numbers
+
+    Parameter closest: the squared distance from each point to its nearest centroid
+    Precondition: closest is a 1D float64 numpy array with an entry for each point
+    """
+    for start, rows in dset.chunks():
+        diff = rows - center
+        dist = numpy.einsum('ij,ij->i', diff, diff)
+        part = closest[start:start + len(rows)]
+        numpy.minimum(part, dist, out=part)
+
+
+def _draw(rng, weights, exclude):
+    """
+    Returns an index drawn with probability proportional to its weight.
+
+    If all the weights are 0, the index is drawn uniformly from those that are
+    not excluded instead.
+
+    Parameter rng: the random number generator
+    Precondition: rng is a numpy Generator
+
+    Parameter weights: the weight of each index
+    Precondition: weights is a 1D numpy array of floats >= 0
+
+    Parameter exclude: the indices that are already taken
+    Precondition: exclude is a set of ints, smaller than len(weights)
+    """
+    total = numpy.cumsum(weights)
+    if total[-1] > 0:
+        index = int(numpy.searchsorted(total, rng.random() * total[-1], side='right'))
+        return min(index, len(weights) - 1)
+    left = numpy.setdiff1d(numpy.arange(len(weights)), list(exclude))
+    return int(left[rng.integers(len(left))])
+
+
+def kmeans_plusplus(dset, k, rng):
+    """
+    Returns a list of k seed indices chosen by k-means++ (D**2 sampling).
+
+    The first seed is a uniformly random point. Each later seed is drawn with
+    probability proportional to the squared distance from the point to its
+    nearest seed so far. These distances are kept in one array, which is lowered
+    (with a vectorized pass over the dataset) after each seed, so choosing the k
+    seeds takes k passes over the dataset.
+
+    Parameter dset: the dataset to choose from
+    Precondition: dset is a Dataset with at least k points
+
+    Parameter k: the number of seeds
+    Precondition: k is an int > 0
+
+    Parameter rng: the random number generator
+    Precondition: rng is a numpy Generator
+    """
+    size = dset.getSize()
+    closest = numpy.full(size, numpy.inf)
+    seeds = [int(rng.integers(size))]
+    while True:
+        _closer(dset, dset.getPoint(seeds[-1], view=True), closest)
+        closest[seeds] = 0.0  # In case of rounding
+        if len(seeds) == k:
+            return seeds
+        seeds.append(_draw(rng, closest, set(seeds)))
+
+
+def kmeans_parallel(dset, k, rng, rounds=ROUNDS, factor=OVERSAMPLE):
+    """
+    Returns a list of k seed indices chosen by k-means|| (scalable k-means++).
+
+    The first candidate is a uniformly random point. Each round then samples
+    every point independently, with probability factor*k times its squared
+    distance to the nearest candidate over the total of these distances, and
+    makes the sampled points candidates. This takes one pass over the dataset
+    for each round (rather than for each seed), and yields about rounds*factor*k
+    candidates. Each candidate is weighted by the number of points nearest to
+    it, and the k seeds are chosen from the candidates by weighted k-means++.
+
+    Parameter dset: the dataset to choose from
+    Precondition: dset is a Dataset with at least k points
+
+    Parameter k: the number of seeds
+    Precondition: k is an int > 0
+
+    Parameter rng: the random number generator
+    Precondition: rng is a numpy Generator
+
+    Parameter rounds: the number of sampling rounds
+    Precondition: rounds is an int >= 0
+
+    Parameter factor: the oversampling factor
+    Precondition: factor is a number > 0
+    """
+    size = dset.getSize()
+    closest = numpy.full(size, numpy.inf)
+    owner = numpy.zeros(size, dtype=numpy.intp)
+    cands = [int(rng.integers(size))]
+    new = cands
+
+    for step in range(rounds + 1):
+        # Measure the points against the new candidates
+        centers = dset.getPoints(numpy.array(new))
+        for start, rows in dset.chunks():
+            labels, dist = a6cluster.nearest_centroids(rows, centers)
+            part = slice(start, start + len(rows))
+            better = dist < closest[part]
+            closest[part][better] = dist[better]
+            owner[part][better] = labels[better] + len(cands) - len(new)
+        closest[cands] = 0.0  # In case of rounding
+        owner[cands] = numpy.arange(len(cands))
+
+        total = closest.sum()
+        if step == rounds or total == 0:
+            break
+        chance = rng.random(size) * total < factor * k * closest
+        new = [int(i) for i in numpy.flatnonzero(chance)]
+        cands.extend(new)
+        if not new:
+            break
+
+    # Choose k of the candidates by weighted k-means++
+    cands = numpy.array(cands)
+    weights = numpy.bincount(owner, minlength=len(cands)).astype(float)
+    points = dset.getPoints(cands).astype(numpy.float64)
+    near = numpy.full(len(cands), numpy.inf)
+    chosen = [_draw(rng, weights, set())]
+    while len(chosen) < min(k, len(cands)):
+        diff = points - points[chosen[-1]]
+        numpy.minimum(near, numpy.einsum('ij,ij->i', diff, diff), out=near)
+        near[chosen] = 0.0
+        chosen.append(_draw(rng, weights * near, set(chosen)))
+    seeds = [int(cands[i]) for i in chosen]
+
+    # Too few candidates (a tiny dataset): add random points that are not seeds
+    if len(seeds) < k:
+        left = numpy.setdiff1d(numpy.arange(size), seeds)
+        seeds.extend(int(i) for i in rng.choice(left, k - len(seeds), replace=False))
+    return seeds
+
+
 class Algorithm(object):
     """
     A class to manage and execute the k-means clustering algorithm.
@@ -65,6 +233,25 @@ class Algorithm(object):
     # Immutable Attributes:
     # - _dataset: The dataset used in the algorithm (Instance of Dataset).
     # - _cluster: A list of Cluster instances representing the clusters.
+    #
+    # Mutable Attributes:
+    # - _assignment: The label of each point after the last _partition (an
+    #   Assignment whose label j is the cluster _cluster[j]), or None before
+    #   the first _partition.
+    # - _limit: The bound on the memory used for each block of points (int > 0).
+    # - _norms: The squared length of each point in the dataset (a 1D numpy
+    #   array), or None if not computed yet.
+    # - _mode: How _partition labels the points (one of MODES).
+    # - _engine: The a6accel engine for _mode, or None if _mode is 'lloyd' or
+    #   the engine has not been made yet.
+    # - _rng: The random number generator for seeding and mini-batches (a
+    #   numpy Generator).
+    # - _tol: The largest centroid move that counts as converged (a float
+    #   >= 0), or None to use Cluster.update's own check.
+    # - _changed: The number of points whose cluster changed in the last
+    #   _partition (all of them in the first), or None before the first.
+    # - _shift: The farthest any centroid moved in the last _update (a float),
+    #   or None before the first.
 
     # Part B: Accessing Clusters
     def getClusters(self):
@@ -79,34 +266,117 @@ class Algorithm(object):
         """
         return self._cluster
 
-    def __init__(self, dset, k, seeds=None):
+    def getLabels(self):
+        """
+        Retrieves the cluster of each point as a read-only array of labels.
+
+        Entry i of the array is the position in getClusters() of the cluster
+        containing point i of the dataset, as of the last partition.
+
+        Returns:
+            numpy.ndarray: A 1D array of ints, or None if the points have not
+            been partitioned yet.
+        """
+        if self._assignment is None:
+            return None
+        return self._assignment.getLabels()
+
+    def getChanged(self):
+        """
+        Retrieves the number of points that changed cluster in the last partition.
+
+        Every point counts as changed in the first partition.
+
+        Returns:
+            int: The number of points, or None if the points have not been
+            partitioned yet.
+        """
+        return self._changed
+
+    def getShift(self):
+        """
+        Retrieves the farthest distance a centroid moved in the last update.
+
+        Returns:
+            float: The distance, or None if the centroids have not been
+            updated yet.
+        """
+        return self._shift
+
+    def __init__(self, dset, k, seeds=None, max_memory=MAX_MEMORY, mode='lloyd',
+                 init='random', rng=None, tol=None):
         """
         Initializes the k-means algorithm with a dataset and cluster count.
 
         If seed indices are provided, they are used to set initial cluster
-        centroids. Otherwise, k random points from the dataset are chosen.
+        centroids. Otherwise, k distinct points from the dataset are chosen as
+        given by init.
 
         Parameters:
             dset: The dataset (Instance of Dataset).
             k: Number of clusters (int, 0 < k <= dset.getSize()).
             seeds: Optional list of seed indices (default is None).
+            max_memory: The bound (in bytes) on the memory that _partition uses
+                   for each block of points (int > 0, default MAX_MEMORY).
+                   Smaller blocks use less memory but take a little longer.
+                   The clusters are the same for any bound.
+            mode: How to label the points (one of MODES, default 'lloyd').
+                   'elkan' keeps bounds on the distance from each point to
+                   each centroid, and skips most distances after the first
+                   step. It only cuts the number of distances computed: the
+                   bounds take n*k numbers of memory, and checking them costs
+                   about as much as the matrix products it skips, so it is
+                   usually no faster than 'lloyd' in time. 'hamerly' keeps
+                   just two bounds for each point, which suits data with few
+                   dimensions, and is the mode most likely to beat 'lloyd'. 'yinyang' keeps a bound for
+                   each group of nearby centroids, which suits large k.
+                   'kdtree' builds a kd-tree over the dataset once, and uses
+                   it to label whole boxes of points at a time, which suits
+                   data with few dimensions and large k. For data with more
+                   than a6accel.FILTER_DIMENSION dimensions, 'kdtree' falls
+                   back to 'lloyd'. The clusters are the same in every mode.
+            init: How to choose the seeds if none are given (one of INITS,
+                   default 'random'). 'random' picks k points uniformly.
+                   'k-means++' picks each point with probability
+                   proportional to its squared distance to the points picked
+                   so far (see kmeans_plusplus), which usually needs far fewer
+                   steps. 'k-means||' does the same with a few oversampled
+                   rounds (see kmeans_parallel), which suits large n and k.
+            rng: The seed of the random number generator (an int), a numpy
+                   Generator, or None for an unpredictable one. The same seed
+                   gives the same initial centroids.
+            tol: The convergence tolerance (default None). A step converges
+                   if no centroid moves farther than tol. If tol is None, a
+                   step converges if every centroid is unchanged up to
+                   rounding (see Cluster.update).
         """
         # Validate input preconditions
         assert isinstance(dset, a6dataset.Dataset)
         assert isinstance(k, int)
         assert 0 < k <= dset.getSize()
         assert seeds is None or valid_seeds(seeds, dset.getSize())
+        assert isinstance(max_memory, int) and max_memory > 0
+        assert mode in MODES
+        assert init in INITS
+        assert tol is None or (type(tol) in [int, float] and tol >= 0)
 
         self._dataset = dset
+        self._rng = numpy.random.default_rng(rng)
         cent = []
 
-        # Initialize centroids from seeds or randomly
-        if seeds is not None:
-            for i in range(k):
-                index = seeds[i]
-                cent.append(dset.getPoint(index))  # Retrieve point at seed index
-        else:
-            cent = random.sample(dset.getContents(), k)  # Randomly sample k points
+        # Choose the seeds (by index, to avoid copying the dataset)
+        if seeds is None:
+            if init == 'k-means++':
+                seeds = kmeans_plusplus(dset, k, self._rng)
+            elif init == 'k-means||':
+                seeds = kmeans_parallel(dset, k, self._rng)
+            else:
+                seeds = self._rng.choice(dset.getSize(), k, replace=False).tolist()
+
+        # Initialize centroids from seeds
+        for i in range(k):
+            index = seeds[i]
+            cent.append(dset.getPoint(index))  # Retrieve point at seed index
 
         # Create cluster objects
         clust = []
@@ -114,6 +384,16 @@ class Algorithm(object):
             c = a6cluster.Cluster(dset, cent[i])
             clust.append(c)
         self._cluster = clust
+        self._assignment = None
+        self._limit = max_memory
+        self._norms = None
+        self._mode = mode
+        if mode == 'kdtree' and dset.getDimension() > a6accel.FILTER_DIMENSION:
+            self._mode = 'lloyd'  # The tree would filter out too little
+        self._engine = None
+        self._tol = tol
+        self._changed = None
+        self._shift = None
 
     # Part C: Nearest Cluster Assignment
     def _nearest(self, point):
@@ -133,41 +413,125 @@ class Algorithm(object):
         # Validate input preconditions
         assert a6dataset.is_point(point)
         assert len(point) == self._dataset.getDimension()
+        return self._closest(point)
 
-        clust = self.getClusters()
-        min = clust[0].distance(point)  # Initialize with the first cluster
-        index = 0
+    def _closest(self, point):
+        """
+        Finds the nearest cluster to the given point based on distance.
+
+        This is _nearest() without the precondition checks, so that it can be
+        called on the read-only rows of a dataset view. The point is measured
+        with a6cluster.nearest_centroids, the same kernel as _partition, so it
+        gets the same cluster either way. The distances are compared, not their
+        squares (which can differ in the last bit when the distances are equal),
+        and the first cluster wins a tie.
 
-        # Iterate over clusters to find the minimum distance
-        for i in range(1, len(clust)):
-            c = clust[i]
-            dis = c.distance(point)
-            if min > dis:  # Update if a closer cluster is found
-                index = i
-                min = dis
+        Parameters:
+            point: A list or 1D numpy array of numerical values, with the same
+                   dimension as the dataset.
 
-        return clust[index]
+        Returns:
+            Cluster: The nearest cluster instance.
+        """
+        clust = self.getClusters()
+        # The same kernel as _partition, so a point gets the same label either way
+        dtype = self._dataset.getDtype()
+        row = numpy.array([point], dtype=dtype)
+        centroids = numpy.array([c._centroid for c in clust], dtype=dtype)
+        labels, _ = a6cluster.nearest_centroids(row, centroids)
+        return clust[int(labels[0])]
 
     def _partition(self):
         """
         Reassigns all points in the dataset to their nearest cluster.
 
-        This method clears all clusters and then assigns each dataset point
-        to the cluster whose centroid is nearest.
+        This method labels each dataset point with the cluster whose centroid
+        is nearest. The labels are stored in a single array (an Assignment), and
+        each cluster becomes a view of the points with its label.
+
+        The points are labeled a block at a time, with the distances to all the
+        centroids computed by matrix products (see a6cluster.nearest_centroids)
+        and the squared length of each point cached between calls. The blocks
+        are small enough that the distances fit in the memory bound. In the
+        accelerated modes, an engine of a6accel labels the points instead.
         """
         clust = self.getClusters()
-
-        # Clear all clusters before reassignment
+        dset = self._dataset
+        centroids = numpy.array([c._centroid for c in clust], dtype=dset.getDtype())
+        cnorms = a6cluster.row_norms(centroids)
+        norms = self._pointNorms()
+        assignment = a6cluster.Assignment(dset.getSize(), centroids)
+        engine = self._getEngine()
+        if engine is not None:
+            engine.start(centroids, norms)
+
+        # The blocks are read-only views, so nothing is copied, and only one
+        # block needs to be in memory (see Dataset.chunks). The sums are added up
+        # over blocks of a fixed size, so rounding (and so the clusters) does not
+        # depend on max_memory, which only bounds the blocks that are labeled.
+        # The labels (ties included) are those of _nearest, which uses the same kernel.
+        size = self._blockSize()
+        for start, rows in dset.chunks():
+            labels = numpy.empty(len(rows), dtype=numpy.intp)
+            for first in range(0, len(rows), size):
+                part = slice(first, first + size)
+                block = norms[start + first:start + first + len(rows[part])]
+                if engine is None:
+                    labels[part], _ = a6cluster.nearest_centroids(rows[part], centroids,
+                                                                  block, cnorms)
+                else:
+                    labels[part] = engine.label(start + first, rows[part], block)
+            assignment._add(start, rows, labels)
+
+        if self._assignment is None or len(self._assignment.getLabels()) != dset.getSize():
+            self._changed = dset.getSize()
+        else:
+            old = self._assignment.getLabels()
+            self._changed = int(numpy.count_nonzero(old != assignment.getLabels()))
+        self._assignment = assignment
         for j in range(len(clust)):
-            clust[j].clear()
+            clust[j]._bind(assignment, j)
 
+    def _getEngine(self):
+        """
+        Returns the engine that labels the points, or None in the 'lloyd' mode.
+
+        The engine is made the first time it is needed, and made again (which
+        resets its bounds) if the size of the dataset changes.
+        """
+        if self._mode == 'lloyd':
+            return None
+        size = self._dataset.getSize()
+        if self._engine is None or self._engine.getSize() != size:
+            self._engine = a6accel.ENGINES[self._mode](self._dataset, len(self._cluster))
+        return self._engine
+
+    def _blockSize(self):
+        """
+        Returns the number of points to label at a time.
+
+        Each point in a block needs a distance to each centroid (in the number
+        type of the dataset) and a float64 difference from its centroid, so the
+        blocks are as large as the memory bound allows for those.
+        """
         dset = self._dataset
+        row = len(self._cluster) * dset.getDtype().itemsize + 16 * dset.getDimension()
+        return max(1, self._limit // row)
+
+    def _pointNorms(self):
+        """
+        Returns a 1D numpy array of the squared length of each point in the dataset.
 
-        # Assign each point to its nearest cluster
-        for i in range(dset.getSize()):
-            point = dset.getPoint(i)
-            c = self._nearest(point)
-            c.addIndex(i)
+        The lengths are computed (a block at a time) the first time they are
+        needed, and again only if the size of the dataset changes.
+        """
+        dset = self._dataset
+        if self._norms is None or len(self._norms) != dset.getSize():
+            norms = numpy.empty(dset.getSize(), dtype=dset.getDtype())
+            for start, rows in dset.chunks():
+                norms[start:start + len(rows)] = a6cluster.row_norms(rows)
+            self._norms = norms
+        return self._norms
 
         # Part D: Updating Centroids
     def _update(self):
@@ -177,20 +541,42 @@ class Algorithm(object):
         This method first updates the centroids of all clusters'. When it is done,
         it checks whether any of them have changed. It returns False if just one
         has changed. Otherwise, it returns True.
+
+        If the Algorithm has a tolerance, a centroid is unchanged if it moved no
+        farther than the tolerance. The farthest move is kept (see getShift).
         """
 
         # Initialize a variable to track whether centroids have changed
         change = True
+        shift = 0.0
 
         # Iterate over each cluster to update its centroid
         for clust in self.getClusters():
-            # Call the update method for the cluster
-            # If any cluster's update method returns False, change is set to False
-            change = clust.update()
+            old = numpy.asarray(clust._centroid, dtype=numpy.float64)
+            # Every cluster must be updated, so the update comes before the test
+            change = clust.update() and change
+            shift = max(shift, float(numpy.linalg.norm(clust._centroid - old)))
+
+        self._shift = shift
+        if self._tol is not None:
+            return shift <= self._tol
 
         # Return the final result: True if no centroids changed, False otherwise
         return change
 
+    def inertia(self):
+        """
+        Returns the sum of squared distances from each point to its cluster's centroid.
+
+        This is the objective that k-means minimizes. It adds up the 'sse' of the
+        statistics of each cluster (see Cluster.stats), which are gathered while
+        _partition assigns the points, so it needs no extra pass over the data.
+        """
+        total = 0.0
+        for clust in self.getClusters():
+            total += clust.stats(False)['sse']
+        return total
+
     def step(self):
         """
         Returns True if the algorithm converges after one step; False otherwise.
@@ -204,14 +590,15 @@ class Algorithm(object):
         self._partition()
 
         # Update the centroids of the clusters and check for convergence
-        self._update()
+        return self._update()
 
     def run(self, maxstep):
         """
         Continues clustering until either it converges or performs maxstep steps.
 
         After the maxstep call to step, if this calculation did not converge,
-        this method will stop.
+        this method will stop. It returns the number of steps performed
+        (including the step that converged).
 
         Parameter maxstep: The maximum number of steps to perform
         Precondition: maxstep is an int >= 0
@@ -228,7 +615,80 @@ class Algorithm(object):
 
             # If the algorithm converges during this step, terminate early
             if s:
-                return
+                return i + 1
+
+        # If the loop completes without convergence, all steps were used
+        return maxstep
+
+    def run_minibatch(self, batch_size, maxstep, patience=PATIENCE):
+        """
+        Runs mini-batch k-means for at most maxstep steps, and returns the number taken.
 
-        # If the loop completes without convergence, simply return
-        return
+        Each step samples batch_size points at random (with the random number
+        generator given to the constructor), labels them with their
+        nearest centroid (see a6cluster.nearest_centroids), and moves each
+        centroid toward its new points. The learning rate of a centroid is one
+        over the number of points it has been given so far in this run, so each
+        centroid is the average of all the points it was given (as in Sculley's
+        mini-batch k-means). A step takes time proportional to batch_size, not
+        to the size of the dataset.
+
+        The run stops early once the smoothed objective (an exponentially weighted
+        average of the mean squared distance from each batch to its centroids)
+        has not improved for patience steps in a row. At the end, the whole
+        dataset is partitioned once, so that the clusters hold their points.
+
+        Parameter batch_size: The number of points in each batch
+        Precondition: batch_size is an int > 0
+
+        Parameter maxstep: The maximum number of steps to perform
+        Precondition: maxstep is an int >= 0
+
+        Parameter patience: The number of steps to wait for an improvement
+        Precondition: patience is an int > 0
+        """
+        assert isinstance(batch_size, int) and batch_size > 0
+        assert isinstance(maxstep, int) and maxstep >= 0
+        assert isinstance(patience, int) and patience > 0
+
+        dset = self._dataset
+        clust = self.getClusters()
+        size = dset.getSize()
+        batch_size = min(batch_size, size)
+        centers = numpy.array([c._centroid for c in clust], dtype=numpy.float64)
+        weights = numpy.zeros(len(clust))
+
+        # The weight of each batch in the smoothed objective
+        alpha = min(1.0, 2.0 * batch_size / (size + 1))
+        smooth = None
+        best = math.inf
+        stall = 0
+
+        steps = 0
+        while steps < maxstep and stall < patience:
+            steps += 1
+            index = self._rng.choice(size, batch_size, replace=False)
+            rows = dset.getPoints(index)
+            labels, dist = a6cluster.nearest_centroids(rows, centers.astype(rows.dtype))
+
+            # Move each centroid to the average of all the points it was given
+            counts = numpy.bincount(labels, minlength=len(clust))
+            sums = numpy.zeros(centers.shape)
+            numpy.add.at(sums, labels, rows)
+            moved = counts > 0
+            weights += counts
+            centers[moved] += (sums[moved] - counts[moved, None] * centers[moved]) / weights[moved, None]
+
+            # Check the smoothed objective for improvement
+            cost = float(dist.mean())
+            smooth = cost if smooth is None else smooth + alpha * (cost - smooth)
+            if smooth < best:
+                best = smooth
+                stall = 0
+            else:
+                stall += 1
+
+        for j in range(len(clust)):
+            clust[j]._centroid = centers[j].tolist()
+        self._partition()
+        return steps
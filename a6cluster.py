@@ -8,19 +8,295 @@ November 15th, 2024
 
 import math
 import random
+import collections.abc
 import numpy
 
 # For accessing the previous parts of the assignment
 import a6dataset
 
+
+# HELPERS TO MEASURE DISTANCES
+def row_norms(rows):
+    """
+    Returns a 1D numpy array of the squared length of each row.
+
+    The lengths are computed in the number type of rows (a float32 table gives
+    float32 lengths).
+
+    Parameter rows: the points to measure
+    Precondition: rows is a 2D numpy array of floats
+    """
+    return numpy.einsum('ij,ij->i', rows, rows)
+
+
+def squared_distances(points, others):
+    """
+    Returns a float64 numpy array of the squared distances between points and others.
+
+    The two arrays are broadcast together, with the coordinates on the last axis.
+    The squared differences are added up one coordinate at a time, in order, in
+    float64, exactly as Cluster.distance does. So the results are the same (to
+    the last bit) as measuring the points one at a time in Python, which is what
+    makes the labels of every mode agree with Algorithm._nearest.
+
+    Parameter points: the points to measure
+    Precondition: points is a numpy array of numbers, with at least one axis (and
+    at least one coordinate)
+
+    Parameter others: the points to measure to
+    Precondition: others is a numpy array of numbers that broadcasts with points
+    """
+    # One contiguous array for each coordinate, so each pass is fast
+    points = numpy.ascontiguousarray(numpy.moveaxis(points, -1, 0), dtype=numpy.float64)
+    others = numpy.ascontiguousarray(numpy.moveaxis(others, -1, 0), dtype=numpy.float64)
+    result = points[0] - others[0]
+    result *= result
+    for i in range(1, len(points)):
+        diff = points[i] - others[i]
+        diff *= diff
+        result += diff
+    return result
+
+
+def exact_distances(rows, centroids):
+    """
+    Returns a 2D float64 numpy array of the squared distances from each row to each centroid.
+
+    Entry [i,j] is the squared distance from rows[i] to centroids[j], computed
+    from the differences as Cluster.distance does (see squared_distances). This
+    is exact, but slower than nearest_centroids. The temporary arrays are the
+    size of the result.
+
+    Parameter rows: the points to measure
+    Precondition: rows is a 2D numpy array of floats
+
+    Parameter centroids: the centroids to measure to
+    Precondition: centroids is a 2D numpy array with the same number of columns
+    """
+    centroids = numpy.asarray(centroids, dtype=rows.dtype)
+    return squared_distances(rows[:, None, :], centroids[None, :, :])
+
+
+def nearest_centroids(rows, centroids, norms=None, centroid_norms=None):
+    """
+    Returns a pair (labels, distances) for the nearest centroid to each row.
+
+    Entry i of labels (a 1D numpy intp array) is the position of the centroid
+    nearest to rows[i], and entry i of distances is the squared distance to it. If
+    two centroids are equally near, the first one wins (as in Algorithm._nearest).
+    As there, the distances are compared after their square roots, so two squared
+    distances that differ only in the last bit are a tie if their roots are equal.
+
+    The squared distances are expanded as ||x||**2 - 2 x.c + ||c||**2, so the bulk
+    of the work is one matrix product (done by BLAS), in the number type of rows.
+    The expansion can lose precision when two centroids are almost equally near.
+    Those rows (and only those) are measured again with exact_distances, so the
+    labels are the same as comparing the distances of Cluster.distance one
+    centroid at a time.
+
+    The result uses a temporary array of len(rows) x len(centroids) numbers. Pass
+    the rows in blocks to bound the memory.
+
+    Parameter rows: the points to label
+    Precondition: rows is a 2D numpy array of floats
+
+    Parameter centroids: the centroids to choose from
+    Precondition: centroids is a 2D numpy array with at least one row, and the same
+    number of columns as rows
+
+    Parameter norms: the squared length of each row (or None to compute them)
+    Precondition: norms is None or the 1D numpy array row_norms(rows)
+
+    Parameter centroid_norms: the squared length of each centroid (or None)
+    Precondition: centroid_norms is None or a 1D numpy array row_norms(centroids)
+    """
+    dtype = rows.dtype
+    centroids = numpy.asarray(centroids, dtype=dtype)
+    if norms is None:
+        norms = row_norms(rows)
+    if centroid_norms is None:
+        centroid_norms = row_norms(centroids)
+
+    # Everything but ||x||**2, which is the same for the whole row
+    dist = rows @ centroids.T
+    dist *= -2
+    dist += centroid_norms
+    labels = dist.argmin(axis=1)
+    nearest = dist[numpy.arange(len(rows)), labels]  # A copy
+
+    if len(centroids) > 1:
+        # Rounding errors are about eps*(||x||**2+||c||**2) for each inner product,
+        # and the float64 sums of exact_distances (and their roots, which must
+        # agree) add a bit more
+        dim = rows.shape[1]
+        slack = (dim + 4) * numpy.finfo(dtype).eps + 4 * (dim + 2) * numpy.finfo(float).eps
+        slack = slack * (norms + centroid_norms.max())
+        dist[numpy.arange(len(rows)), labels] = numpy.inf
+        second = dist.min(axis=1)
+        close = numpy.flatnonzero(second - nearest <= slack)
+        if len(close):
+            exact = exact_distances(rows[close], centroids)
+            labels[close] = numpy.sqrt(exact).argmin(axis=1)
+            nearest[close] = exact[numpy.arange(len(close)), labels[close]] - norms[close]
+
+    nearest += norms
+    return labels, numpy.maximum(nearest, 0, out=nearest)
+
 # TASK 2: CLUSTER
+class IndexView(collections.abc.Sequence):
+    """
+    A class representing a live, read-only view of the indices of a cluster.
+
+    This is what Cluster.getIndices returns. Like the list that it used to
+    return, it always shows the current indices of the cluster (in the order
+    they were added), and it compares equal to (and prints like) a list of
+    them. Unlike that list, it cannot be changed; use Cluster.addIndex,
+    removeIndex and clear instead. Checking whether an index is in it takes
+    constant time (see Cluster.hasIndex).
+    """
+    # Attribute _cluster: The cluster whose indices this shows
+    # Invariant: _cluster is a Cluster
+    __slots__ = ('_cluster',)
+
+    def __init__(self, cluster):
+        """
+        Initializes a new view of the indices of the given cluster.
+
+        Parameter cluster: the cluster to view
+        Precondition: cluster is a Cluster
+        """
+        self._cluster = cluster
+
+    def __len__(self):
+        """
+        Returns the number of points in the cluster.
+        """
+        return len(self._cluster._members())
+
+    def __getitem__(self, key):
+        """
+        Returns the index at the given position (or a list, for a slice).
+
+        Parameter key: the position or positions to get
+        Precondition: key is an int or a slice
+        """
+        result = self._cluster._members()[key]
+        if isinstance(key, slice):
+            return result.tolist()
+        return int(result)
+
+    def __iter__(self):
+        """
+        Returns an iterator over the indices (as they are now).
+        """
+        return iter(self._cluster._members().tolist())
+
+    def __contains__(self, index):
+        """
+        Returns True if index is one of the indices.
+
+        Parameter index: the value to look for
+        Precondition: index can be anything
+        """
+        if isinstance(index, int) and not isinstance(index, bool):
+            return index >= 0 and self._cluster.hasIndex(index)
+        return super().__contains__(index)
+
+    def __eq__(self, other):
+        """
+        Returns True if other is a list (or view) of the same indices, in order.
+
+        Parameter other: the value to compare to
+        Precondition: other can be anything
+        """
+        if isinstance(other, (IndexView, list)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        """
+        Returns the indices as a string, like a list of them.
+        """
+        return repr(list(self))
+
+
 class Cluster(object):
     """
     A class representing a cluster, a subset of the points in a dataset.
 
-    A cluster is represented as a list of integers that give the indices in the
-    dataset of the points contained in the cluster.
+    A cluster is represented as an array of integers that give the indices in the
+    dataset of the points contained in the cluster, in the order they were added.
+    A bitmap with one bit per point of the dataset records which points are in
+    the cluster, so checking for (and skipping) duplicates takes constant time.
+
+    The cluster also keeps a running (float64) sum of the coordinates of its
+    points, which addIndex, removeIndex and clear update in time proportional to
+    the dimension. So recomputing the centroid never has to revisit the points.
+    In the same way, it keeps the squared deviations of its points (for each
+    dimension) from the centroid at the time it was last cleared, and the largest
+    squared distance. These give the statistics of the cluster (see stats) with
+    no extra pass over the points after Algorithm._partition.
+
+    The clusters made by Algorithm._partition do not store their own indices.
+    Instead, they are views of an Assignment, one label array shared by all the
+    clusters, and they get their statistics from the grouped sums of that
+    assignment. A view is turned into an ordinary cluster (with its own indices
+    and bitmap) the first time that addIndex or removeIndex changes it.
     """
+    # Attribute _dataset: The dataset the points are taken from
+    # Invariant: _dataset is a Dataset
+    #
+    # Attribute _centroid: The centroid of this cluster
+    # Invariant: _centroid is a list of getDimension() numbers
+    #
+    # Attribute _assignment: The assignment this cluster is a view of
+    # Invariant: _assignment is None or an Assignment. If it is an Assignment,
+    # the points in this cluster are those with label _label, and _buffer and
+    # _bitmap are None.
+    #
+    # Attribute _label: The label of this cluster in _assignment
+    # Invariant: _label is an int >= 0, or None if _assignment is None
+    #
+    # Attribute _indices: The indices of the points, as getIndices returns them
+    # Invariant: _indices is the IndexView of this cluster
+    #
+    # Attribute _buffer: The storage buffer for the indices of the points
+    # Invariant: _buffer is a 1D numpy array of ints whose first _count entries
+    # are the (distinct) indices of the points in this cluster.
+    #
+    # Attribute _count: The number of points in this cluster
+    # Invariant: _count is an int >= 0
+    #
+    # Attribute _bitmap: The membership bitmap
+    # Invariant: _bitmap is None (no points added since the last reset) or a
+    # bytearray. Bit (i % 8) of byte (i // 8) is set if and only if i is one of
+    # the indices in this cluster.
+    #
+    # Attribute _sum: The sum of the points in this cluster
+    # Invariant: _sum is a 1D float64 numpy array of getDimension() numbers
+    #
+    # Attribute _radius: The cached result of getRadius
+    # Invariant: _radius is None or a pair (centroid, radius), where centroid is
+    # the _centroid object the radius was computed for
+    #
+    # Attribute _anchor: The centroid when this cluster was last cleared
+    # Invariant: _anchor is the _centroid object at the last call to clear (or
+    # initialization)
+    #
+    # Attribute _origin: The numbers in _anchor
+    # Invariant: _origin is a 1D float64 numpy array equal to _anchor
+    #
+    # Attribute _deviation: The squared deviations of the points from _origin
+    # Invariant: _deviation is a 1D float64 numpy array. Entry j is the sum over
+    # the points in this cluster of (point[j]-_origin[j])**2.
+    #
+    # Attribute _farthest: The largest squared distance of a point from _origin
+    # Invariant: _farthest is a float >= 0, or None if unknown (after removeIndex)
+    __slots__ = ('_dataset', '_centroid', '_assignment', '_label', '_indices', '_buffer',
+                 '_count', '_bitmap', '_sum', '_radius', '_anchor', '_origin', '_deviation',
+                 '_farthest')
 
     # Part A
     def getIndices(self):
@@ -28,10 +304,24 @@ class Cluster(object):
         Returns the indices of points in this cluster.
 
         This method allows direct access to the indices of points within the cluster.
-        Note that changes to the returned list will reflect on the cluster directly.
+        The result is the same IndexView on every call, and it always shows the
+        current indices, in the order they were added (for the clusters made by
+        Algorithm._partition, this is increasing order). It is read-only: use
+        addIndex, removeIndex and clear to change the cluster.
         """
         return self._indices
 
+    def _members(self):
+        """
+        Returns a 1D numpy array of the indices of points in this cluster.
+
+        This is getIndices() as an array. The array may share memory with this
+        cluster, so it should not be modified.
+        """
+        if self._assignment is not None:
+            return self._assignment.getMembers(self._label)
+        return self._buffer[:self._count]
+
     def getCentroid(self):
         """
         Returns a COPY of the centroid of this cluster.
@@ -46,7 +336,7 @@ class Cluster(object):
         Initializes a new empty cluster with a given dataset and centroid.
 
         - Ensures that the centroid and dataset meet the required preconditions.
-        - Creates an empty list for storing indices of points within the cluster.
+        - Creates empty storage for the indices of points within the cluster.
         """
         # Preconditions: Validating input parameters
         assert a6dataset.is_point(centroid)
@@ -54,108 +344,379 @@ class Cluster(object):
         assert len(centroid) == dset.getDimension()
 
         # Attribute initialization
-        self._indices = []  # Stores indices of points in the cluster
+        self._assignment = None  # Not a view of an assignment
+        self._label = None
+        self._indices = IndexView(self)  # The indices, as getIndices returns them
+        self._buffer = numpy.empty(8, dtype=numpy.intp)  # Storage for the indices
+        self._count = 0  # No points yet
+        self._bitmap = None  # Membership bits (made by the first addIndex)
+        self._sum = numpy.zeros(len(centroid))  # Sum of the points (none yet)
+        self._radius = None  # Radius not computed yet
         self._dataset = dset  # Reference to the dataset
         self._centroid = centroid.copy()  # Copy of the provided centroid
+        self._restart()  # Statistics about this centroid
 
     def addIndex(self, index):
         """
         Adds the given dataset index to this cluster.
 
-        - Checks if the index is already present in the cluster to avoid duplicates.
-        - Appends the index if it is not already present.
+        - Checks the bitmap to see if the index is already present (to avoid duplicates).
+          The bitmap is only allocated here, when the first point is added.
+        - Appends the index if it is not already present, doubling the storage if full.
+        - Adds the point to the running sum and statistics.
         """
         assert isinstance(index, int)
         assert index >= 0
         assert index < self._dataset.getSize()
 
-        if index not in self._indices:
-            self._indices.append(index)
+        if self._assignment is not None:
+            if self.hasIndex(index):
+                return
+            self._detach()
+
+        byte, bit = index >> 3, 1 << (index & 7)
+        if self._bitmap is None:
+            self._bitmap = bytearray((self._dataset.getSize() + 7) // 8)
+        elif byte >= len(self._bitmap):
+            # The dataset has grown since the bitmap was made
+            self._bitmap.extend(bytes((self._dataset.getSize() + 7) // 8 - len(self._bitmap)))
+        if self._bitmap[byte] & bit:
+            return
+        self._bitmap[byte] |= bit
+
+        if self._count == len(self._buffer):
+            self._buffer = numpy.concatenate((self._buffer, self._buffer))
+        self._buffer[self._count] = index
+        self._count += 1
+        self._radius = None
+
+        point = self._dataset.getPoint(index, view=True)
+        self._sum += point
+        diff = point - self._origin
+        diff *= diff
+        self._deviation += diff
+        if self._farthest is not None:
+            self._farthest = max(self._farthest, float(diff.sum()))
+
+    def removeIndex(self, index):
+        """
+        Removes the given dataset index from this cluster (if it is present).
+
+        - Checks the bitmap to see if the index is present.
+        - Removes it from the indices, keeping the others in order.
+        - Subtracts the point from the running sum and statistics.
+        """
+        assert isinstance(index, int)
+        assert index >= 0
+        assert index < self._dataset.getSize()
+
+        if not self.hasIndex(index):
+            return
+        if self._assignment is not None:
+            self._detach()
+        self._bitmap[index >> 3] &= ~(1 << (index & 7))
+
+        members = self._buffer[:self._count]
+        pos = int(numpy.flatnonzero(members == index)[0])
+        members[pos:-1] = members[pos + 1:]
+        self._count -= 1
+        self._radius = None
+
+        point = self._dataset.getPoint(index, view=True)
+        self._sum -= point
+        self._deviation -= (point - self._origin) ** 2
+        self._farthest = None  # The farthest point may be gone
+
+    def hasIndex(self, index):
+        """
+        Returns True if the given dataset index is in this cluster.
+
+        This takes constant time (it checks a single bit of the bitmap).
+
+        Parameter index: the dataset index to check
+        Precondition: index is an int >= 0
+        """
+        assert isinstance(index, int) and index >= 0
+        if self._assignment is not None:
+            return self._assignment.hasMember(index, self._label)
+        if self._bitmap is None:
+            return False
+        byte = index >> 3
+        return byte < len(self._bitmap) and bool(self._bitmap[byte] & (1 << (index & 7)))
 
     def clear(self):
         """
         Removes all points from this cluster while keeping the centroid unchanged.
+
+        Only the bits of the points that were in the cluster are reset, so this
+        takes time proportional to the size of the cluster (not the dataset).
+        A view of an assignment gets new (empty) storage of its own instead.
         """
-        self._indices = []  # Reset the list of indices
+        if self._assignment is not None:
+            self._assignment = None
+            self._label = None
+            self._buffer = numpy.empty(8, dtype=numpy.intp)
+            self._bitmap = None
+            self._sum = numpy.zeros(len(self._sum))
+        elif self._bitmap is not None:
+            for index in self._buffer[:self._count].tolist():
+                self._bitmap[index >> 3] = 0
+        self._count = 0
+        self._sum[:] = 0.0
+        self._radius = None
+        self._restart()
 
-    def getContents(self):
+    def _restart(self):
+        """
+        Restarts the statistics of this cluster from the current centroid.
+
+        The deviations are measured from the centroid from now on.
+        Precondition: the cluster is empty
+        """
+        self._anchor = self._centroid
+        self._origin = numpy.array(self._centroid, dtype=numpy.float64)
+        self._deviation = numpy.zeros(len(self._origin))
+        self._farthest = 0.0
+
+    def _bind(self, assignment, label):
+        """
+        Makes this cluster a view of the points with the given label.
+
+        The cluster no longer has its own indices. Its size, sum and statistics are
+        copied from the grouped sums of the assignment, which were measured from
+        the current centroid. This takes time proportional to the dimension.
+
+        Parameter assignment: the assignment to view
+        Precondition: assignment is an Assignment of the dataset of this cluster,
+        whose centroid for label is the current centroid of this cluster
+
+        Parameter label: the label of this cluster
+        Precondition: label is an int >= 0 less than the number of labels
+        """
+        self._assignment = assignment
+        self._label = label
+        self._buffer = None
+        self._bitmap = None
+        self._radius = None
+        count, total, deviation, farthest = assignment._group(label)
+        self._count = count
+        self._sum = total
+        self._anchor = self._centroid
+        self._origin = numpy.array(self._centroid, dtype=numpy.float64)
+        self._deviation = deviation
+        self._farthest = farthest
+
+    def _detach(self):
+        """
+        Gives this view of an assignment its own indices and bitmap.
+
+        The indices are copied in increasing order. The statistics are unchanged.
+        Precondition: _assignment is not None
+        """
+        members = self._members()
+        self._buffer = numpy.empty(max(8, 2 * len(members)), dtype=numpy.intp)
+        self._buffer[:len(members)] = members
+
+        bits = numpy.zeros(((self._dataset.getSize() + 7) // 8) * 8, dtype=bool)
+        bits[members] = True
+        self._bitmap = bytearray(numpy.packbits(bits, bitorder='little'))
+        self._assignment = None
+        self._label = None
+
+    def getContents(self, view=False):
         """
         Returns a new list containing copies of the points in this cluster.
 
-        - Uses the indices to fetch points from the dataset.
-        - Ensures that each point is a copy to prevent unintended modifications.
+        - Uses the indices to gather the points from the dataset in one step.
+        - Copies each point exactly once, into the returned list.
+        - If view is True, returns the gathered points as a read-only 2D numpy
+          array instead, so no list is built for each point.
+
+        Code that only needs to look at each point once (to reduce, export or draw
+        them) should prefer chunks(), which never holds all the points at once.
+
+        Parameter view: whether to return a read-only array instead of a list
+        Precondition: view is a bool
+        """
+        points = self._dataset.getPoints(self._members())
+        if view:
+            return points
+        return points.tolist()
+
+    def chunks(self):
         """
-        contents = []
-        for index in self._indices:
-            contents.append(self._dataset.getPoint(index).copy())
-        return contents
+        Generates the points in this cluster as blocks of a read-only 2D numpy array.
+
+        The blocks are gathered straight from the storage of the dataset, with the
+        indices in increasing order (not the order they were added), so each
+        block reads the dataset in order. Each block holds about
+        a6dataset.CHUNK_BYTES bytes, so only one block of points is in memory at
+        a time, and nothing is allocated for each point.
+        """
+        dset = self._dataset
+        size = max(1, a6dataset.CHUNK_BYTES // (dset.getDimension() * dset.getDtype().itemsize))
+        ind = self._members()
+        if self._assignment is None:
+            ind = numpy.sort(ind)
+        for start in range(0, len(ind), size):
+            yield dset.getPoints(ind[start:start + size])
 
     # Part B
-    def distance(self, point):
+    def distance(self, point, squared=False):
         """
         Returns the Euclidean distance between the given point and the cluster's centroid.
 
         - Iterates over each dimension to calculate the squared difference.
         - Uses the square root of the sum of squared differences to compute the distance.
+        - If squared is True, returns the sum of squared differences instead. This
+          is cheaper, and is enough to tell which of two points is closer.
         """
         assert a6dataset.is_point(point)
-        assert len(point) == len(self.getCentroid())
+        assert len(point) == len(self._centroid)
+        return self._distance(point, squared)
+
+    def _distance(self, point, squared=False):
+        """
+        Returns the Euclidean distance between the given point and the cluster's centroid.
 
-        cent = self.getCentroid()
+        This is distance() without the precondition checks, so it can be called on
+        the read-only rows of a dataset view (and it does not copy the centroid).
+
+        Parameter point: the point to measure
+        Precondition: point is a list or 1D numpy array of getDimension() numbers
+
+        Parameter squared: whether to return the squared distance
+        Precondition: squared is a bool
+        """
+        cent = self._centroid
         sum = 0
         for i in range(len(point)):
             temp = float(cent[i]) - float(point[i])  # Difference in each dimension
-            temp = pow(temp, 2)  # Squared difference
-            sum += temp
+            sum += temp * temp  # Squared difference
+        if squared:
+            return sum
         return math.sqrt(sum)  # Euclidean distance
 
+    def distances(self, points, squared=False):
+        """
+        Returns a 1D numpy array of the distances from each point to the centroid.
+
+        This is the batched version of distance(): the whole block of points is
+        measured in a single vectorized operation, in the number type of the
+        dataset (see Dataset.getDtype). If squared is True, the squared distances
+        are returned (which skips the square roots).
+
+        Parameter points: the points to measure
+        Precondition: points is a 2D numpy array (such as a view from the dataset)
+        or a list of points. Every point has getDimension() numbers.
+
+        Parameter squared: whether to return the squared distances
+        Precondition: squared is a bool
+        """
+        assert a6dataset.is_point_table(points, len(self._centroid))
+        result = self._distances(points)
+        if squared:
+            return result
+        return numpy.sqrt(result, out=result)
+
+    def _distances(self, points):
+        """
+        Returns a 1D numpy array of the squared distances from each point to the centroid.
+
+        This is distances() without the precondition checks.
+
+        Parameter points: the points to measure
+        Precondition: points is a 2D numpy array or a list of points, each with
+        getDimension() numbers
+        """
+        dtype = self._dataset.getDtype()
+        points = numpy.asarray(points, dtype=dtype)
+        diff = points - numpy.asarray(self._centroid, dtype=dtype)
+        return numpy.einsum('ij,ij->i', diff, diff)
+
     def getRadius(self):
         """
         Returns the maximum distance from any point in the cluster to the centroid.
 
-        - Iterates over all points in the cluster.
-        - Computes the distance to the centroid for each point.
-        - Tracks the maximum distance encountered.
+        - Measures the points a block at a time, with one vectorized max per block.
+        - Compares squared distances, so there is only one square root.
+        - Caches the result until the points (addIndex, removeIndex, clear) or the
+          centroid (update) change.
+        - Needs no pass at all if the centroid has not changed since the points
+          were added (as after Algorithm._partition).
         """
-        max = 0  # Initialize maximum distance
-        contents = self.getContents()
-        for i in range(len(contents)):
-            temp = self.distance(contents[i])
-            if temp > max:  # Update maximum if the current distance is greater
-                max = temp
-        return max
+        if self._anchor is self._centroid and self._farthest is not None:
+            return math.sqrt(self._farthest)
+        if self._radius is not None and self._radius[0] is self._centroid:
+            return self._radius[1]
+
+        largest = 0.0  # Initialize maximum (squared) distance
+        for rows in self.chunks():
+            largest = max(largest, float(self._distances(rows).max()))
+        radius = math.sqrt(largest)
+
+        self._radius = (self._centroid, radius)
+        return radius
 
     def update(self):
         """
         Updates the cluster's centroid to the average of its points.
 
-        - Computes the average for each coordinate separately.
+        - Divides the running sum by the number of points (no pass over the points).
         - Uses numpy.allclose to determine whether the centroid has changed.
         - If there are no points in the cluster, the centroid remains unchanged.
         """
         old_centroid = self.getCentroid()  # Current centroid before updating
-        dim = len(old_centroid)  # Number of dimensions
-        new_centroid = [0.0] * dim  # Initialize a new centroid with zeros
-
-        ind = self.getIndices()  # Get indices of points in the cluster
-        dset = self._dataset  # Reference to the dataset
 
-        if ind == []:  # If the cluster is empty, no update is performed
+        if self._count == 0:  # If the cluster is empty, no update is performed
             return True
 
         # Compute the average for each dimension
-        for i in range(dim):
-            total = 0
-            for j in range(len(ind)):
-                index = ind[j]
-                point = dset.getPoint(index)
-                total += point[i]
-            new_centroid[i] = total / len(ind)
-
-        # Update the centroid and check for stability
-        self._centroid = new_centroid
+        new_centroid = (self._sum / self._count).tolist()
+
+        # Update the centroid (if it moved at all) and check for stability
+        if new_centroid != old_centroid:
+            self._centroid = new_centroid
         return numpy.allclose(old_centroid, new_centroid)
 
+    def stats(self, radius=True):
+        """
+        Returns a dictionary of statistics about the points in this cluster.
+
+        The keys of the dictionary are
+            'size':     the number of points
+            'sse':      the sum of the squared distances from the points to the centroid
+            'radius':   the largest distance from a point to the centroid (getRadius)
+            'variance': a list with the variance of the points in each dimension
+
+        These come from the running sums kept by addIndex, so they cost time
+        proportional to the dimension, with no pass over the points. The one
+        exception is the radius after the centroid has moved (see getRadius),
+        so it is left out of the dictionary if radius is False.
+
+        Parameter radius: whether to include the radius
+        Precondition: radius is a bool
+        """
+        dim = len(self._origin)
+        if self._count == 0:
+            result = {'size': 0, 'sse': 0.0, 'variance': [0.0] * dim}
+            if radius:
+                result['radius'] = 0.0
+            return result
+
+        count = self._count
+        mean = self._sum / count
+        # Shift the deviations from _origin to the centroid and to the mean
+        shift = self._origin - numpy.asarray(self._centroid, dtype=numpy.float64)
+        spread = self._deviation + shift * (2 * (self._sum - count * self._origin) + count * shift)
+        variance = self._deviation / count - (mean - self._origin) ** 2
+
+        result = {'size': count, 'sse': float(max(spread.sum(), 0.0)),
+                  'variance': numpy.maximum(variance, 0.0).tolist()}
+        if radius:
+            result['radius'] = self.getRadius()
+        return result
+
     # PROVIDED METHODS: Do not modify!
     def __str__(self):
         """
@@ -168,3 +729,164 @@ class Cluster(object):
         Returns an unambiguous representation of this cluster.
         """
         return str(self.__class__) + str(self)
+
+
+# TASK 2B: ASSIGNMENT
+class Assignment(object):
+    """
+    A class representing the cluster of every point in a dataset.
+
+    An assignment is one integer label array with an entry for each point of the
+    dataset: entry i is the label (the position in the list of clusters) of the
+    cluster containing point i. The clusters made by Algorithm._partition are
+    views of an assignment (see Cluster), so there is a single array of length n
+    however many clusters there are.
+
+    While the labels are recorded, the assignment also sums the points of each
+    label, their squared deviations from the centroid of the label, and the
+    largest squared distance to that centroid. Each of these is a grouped
+    reduction (numpy.bincount) over a whole block of points, so no Python code
+    runs for each point. The members of each label are only found (by sorting
+    the labels) when a cluster needs its indices or points.
+    """
+    # Attribute _labels: The label of each point
+    # Invariant: _labels is a 1D numpy intp array with one entry for each point.
+    # Each entry is >= 0 and less than the number of labels.
+    #
+    # Attribute _centroids: The centroid of each label
+    # Invariant: _centroids is a 2D float64 numpy array with one row for each label
+    #
+    # Attribute _counts: The number of points with each label
+    # Invariant: _counts is a 1D numpy intp array with one entry for each label
+    #
+    # Attribute _sums: The sum of the points with each label
+    # Invariant: _sums is a 2D float64 numpy array, the same shape as _centroids
+    #
+    # Attribute _deviations: The squared deviations from the centroid of each label
+    # Invariant: _deviations is a 2D float64 numpy array, the same shape as
+    # _centroids. Entry [j,d] is the sum over the points with label j of
+    # (point[d]-_centroids[j,d])**2.
+    #
+    # Attribute _farthest: The largest squared distance to the centroid of each label
+    # Invariant: _farthest is a 1D float64 numpy array with one entry for each label
+    #
+    # Attribute _order: The indices of the points, grouped by label
+    # Invariant: _order is None (not computed yet) or a 1D numpy intp array with
+    # the indices of label 0 (in increasing order), then those of label 1, and so on
+    #
+    # Attribute _bounds: The start of each label in _order
+    # Invariant: _bounds is None if _order is None. Otherwise it is a 1D numpy
+    # array where the indices with label j are _order[_bounds[j]:_bounds[j+1]].
+    __slots__ = ('_labels', '_centroids', '_counts', '_sums', '_deviations', '_farthest',
+                 '_order', '_bounds')
+
+    def getLabels(self):
+        """
+        Returns a read-only 1D numpy array of the label of each point.
+        """
+        return a6dataset._readonly(self._labels)
+
+    def getCounts(self):
+        """
+        Returns a read-only 1D numpy array of the number of points with each label.
+        """
+        return a6dataset._readonly(self._counts)
+
+    def __init__(self, size, centroids):
+        """
+        Initializes a new assignment where every point has label 0.
+
+        The labels are recorded (and the grouped sums gathered) by calling _add for
+        consecutive blocks of points.
+
+        Parameter size: the number of points
+        Precondition: size is an int >= 0
+
+        Parameter centroids: the centroid of each label
+        Precondition: centroids is a 2D numpy array (or a list of points) with at
+        least one row
+        """
+        centroids = numpy.array(centroids, dtype=numpy.float64)
+        assert isinstance(size, int) and size >= 0
+        assert centroids.ndim == 2 and len(centroids) > 0
+
+        k = len(centroids)
+        self._labels = numpy.zeros(size, dtype=numpy.intp)
+        self._centroids = centroids
+        self._counts = numpy.zeros(k, dtype=numpy.intp)
+        self._sums = numpy.zeros(centroids.shape)
+        self._deviations = numpy.zeros(centroids.shape)
+        self._farthest = numpy.zeros(k)
+        self._order = None
+        self._bounds = None
+
+    def _add(self, start, rows, labels):
+        """
+        Records the labels of a block of points and adds them to the grouped sums.
+
+        The sums are rounded differently if the points are split into blocks
+        differently, so the blocks should not depend on settings such as a
+        memory bound (Algorithm._partition uses the blocks of Dataset.chunks).
+
+        Parameter start: the index of the first point in the block
+        Precondition: start is an int >= 0
+
+        Parameter rows: the points in the block
+        Precondition: rows is a 2D numpy array with a row for each point
+
+        Parameter labels: the label of each point in the block
+        Precondition: labels is a 1D numpy array of ints, one for each row
+        """
+        k, dim = self._centroids.shape
+        self._labels[start:start + len(rows)] = labels
+        self._counts += numpy.bincount(labels, minlength=k)
+
+        # One bincount for all the dimensions, grouped by (label, dimension)
+        groups = (labels[:, None] * dim + numpy.arange(dim)).ravel()
+        self._sums += numpy.bincount(groups, rows.ravel(), k * dim).reshape(k, dim)
+        diff = rows - self._centroids[labels]
+        diff *= diff
+        self._deviations += numpy.bincount(groups, diff.ravel(), k * dim).reshape(k, dim)
+        numpy.maximum.at(self._farthest, labels, diff.sum(axis=1))
+        self._order = None
+        self._bounds = None
+
+    def _group(self, label):
+        """
+        Returns the statistics of the points with the given label.
+
+        The value returned is a tuple (count, sum, deviation, farthest), where sum
+        and deviation are new 1D float64 numpy arrays (see the attribute invariants).
+
+        Parameter label: the label to look up
+        Precondition: label is an int >= 0 less than the number of labels
+        """
+        return (int(self._counts[label]), self._sums[label].copy(),
+                self._deviations[label].copy(), float(self._farthest[label]))
+
+    def getMembers(self, label):
+        """
+        Returns a read-only 1D numpy array of the indices of points with the given label.
+
+        The indices are in increasing order. The first call sorts all the labels (a
+        stable argsort), which later calls for any label reuse.
+
+        Parameter label: the label to look up
+        Precondition: label is an int >= 0 less than the number of labels
+        """
+        if self._order is None:
+            self._order = numpy.argsort(self._labels, kind='stable')
+            self._bounds = numpy.concatenate(([0], numpy.cumsum(self._counts)))
+        return a6dataset._readonly(self._order[self._bounds[label]:self._bounds[label + 1]])
+
+    def hasMember(self, index, label):
+        """
+        Returns True if the point at the given index has the given label.
+
+        Parameter index: the index of the point
+        Precondition: index is an int >= 0
+
+        Parameter label: the label to check
+        Precondition: label is an int >= 0
+        """
+        return index < len(self._labels) and int(self._labels[index]) == label
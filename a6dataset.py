@@ -5,10 +5,32 @@ Renee Gowda (rsg276) and Muskan Gupta (mg2379)
 November 15th, 2024
 """
 
+import os
 import math
 import random
+import struct
+import itertools
 import numpy
 
+# The number of rows converted at a time when adding points from an iterator
+BLOCK_ROWS = 4096
+
+# Lists of points longer than this are validated in bulk (see is_point_table)
+CHECK_ROWS = 1024
+
+# The (approximate) number of bytes in each block produced by Dataset.chunks
+CHUNK_BYTES = 1 << 22
+
+# The types of number a dataset can store. float32 halves the memory (and memory
+# bandwidth) of a dataset, at the cost of precision.
+DTYPES = (numpy.float32, numpy.float64)
+
+# The binary file format of Dataset.save: a 64 byte header, then the raw points.
+# The header is the magic string, the dtype of the numbers (a numpy type string,
+# such as '<f8'), the dimension and the size, padded with zeros.
+FILE_MAGIC = b'A6KMEANS'
+FILE_HEADER = struct.Struct('<8s8sQQ32x')
+
 # TASK 0: HELPERS TO CHECK PRECONDITIONS
 def is_point(value):
     """
@@ -31,6 +53,8 @@ def is_point_list(value):
     Returns True if value is a list of points (int/float lists)
 
     This function also checks that all points in value have the same dimension.
+    It checks every element in Python, so it is meant for small tables. Use
+    is_point_table for large ones.
 
     Parameter value: a value to check
     Precondition: value can be anything
@@ -39,25 +63,108 @@ def is_point_list(value):
     if not isinstance(value, list):
         return False
 
-    # Check that all elements in the list are valid points
+    # Check that all elements are valid points with the same length (dimension)
     for i in range(len(value)):
         if not is_point(value[i]):
             return False
-
-    # Ensure all points have the same length (dimension)
-    length = len(value[0])
-    for i in range(len(value)):
-        if len(value[i]) != length:
+        if len(value[i]) != len(value[0]):
             return False
     return True
 
+def is_point_table(value, dim=None):
+    """
+    Returns True if value is a rectangular table of numbers (int/float)
+
+    A table is either a list of points or a 2D numpy array of numbers. If dim is
+    not None, the table must also have dim columns. Lists with at most
+    CHECK_ROWS points are checked exactly like is_point_list. Anything larger is
+    checked in bulk: the rows must be lists (as in is_point_list), and then the
+    whole table is converted in one vectorized pass, and its shape and type are
+    checked once.
+
+    Parameter value: a value to check
+    Precondition: value can be anything
+
+    Parameter dim: the number of columns expected (or None to allow any)
+    Precondition: dim is None or an int > 0
+    """
+    return _as_table(value, dim) is not None
+
+def _as_table(value, dim, trusted=False, dtype=numpy.float64):
+    """
+    Returns value as a 2D numpy array of dtype, or None if it is not a table.
+
+    This is the validation engine behind is_point_table, and it converts the
+    table while it checks it. If trusted is True, the (expensive) type checks
+    are skipped and only the shape of the converted array is checked. This is
+    for data that comes from our own loaders.
+
+    Parameter value: the table to convert
+    Precondition: value can be anything
+
+    Parameter dim: the number of columns expected (or None to allow any)
+    Precondition: dim is None or an int > 0
+
+    Parameter trusted: whether to skip the type checks
+    Precondition: trusted is a bool
+
+    Parameter dtype: the type of number in the result
+    Precondition: dtype is one of DTYPES
+    """
+    if not trusted:
+        if isinstance(value, list):
+            if len(value) <= CHECK_ROWS:
+                if not is_point_list(value):
+                    return None
+            elif not all(isinstance(row, list) for row in value):
+                # Tuples or arrays would convert, but they are not points
+                return None
+        elif not isinstance(value, numpy.ndarray):
+            return None
+
+    try:
+        if trusted:
+            table = numpy.asarray(value, dtype=dtype)
+        else:
+            table = numpy.asarray(value)
+    except (ValueError, TypeError):
+        # Rows of different lengths, or entries that are not numbers
+        return None
+
+    if table.ndim != 2 or (dim is not None and table.shape[1] != dim):
+        return None
+    if table.dtype.kind not in 'biuf':
+        return None
+    return table.astype(dtype, copy=False)
+
+def _readonly(array):
+    """
+    Returns a read-only view of the given numpy array.
+
+    The view shares memory with array, but cannot be used to modify it.
+
+    Parameter array: the array to view
+    Precondition: array is a numpy array
+    """
+    result = array.view()
+    result.flags.writeable = False
+    return result
+
 # TASK 1: DATASET
 class Dataset(object):
     """
     A class representing a dataset for k-means clustering.
 
-    The data is stored as a list of points (int/float lists). All points have
-    the same number of elements which is the dimension of the dataset.
+    The data is stored as a single contiguous table of floats (a 2D numpy array)
+    of either float64 (the default) or float32 numbers.
+    All points have the same number of elements which is the dimension of the
+    dataset. The table has room for more rows than are in use, and doubles its
+    capacity whenever it runs out, so adding points one at a time is amortized
+    constant time.
+
+    The methods slice and subset return datasets that share the table of this
+    one, rather than copying the points. A subset picks its points out of the
+    table through an array of row positions.
 
     None of the attributes should be accessed directly outside of the class
     Dataset (e.g. in the methods of class Cluster or KMeans). Instead, this class
@@ -69,9 +176,18 @@ class Dataset(object):
     # Invariant: _dimension is an int > 0.
     #
     # MUTABLE ATTRIBUTES (Can be changed at any time, via addPoint)
-    # Attribute _contents: The dataset contents
-    # Invariant: _contents is a table of numbers (float or int), possibly empty.
-    # Each row of _contents is a list of size _dimension
+    # Attribute _data: The storage buffer for the dataset contents
+    # Invariant: _data is a 2D numpy array with _dimension columns, whose dtype
+    # is one of DTYPES.
+    # The number of rows is the capacity, which is at least _size.
+    #
+    # Attribute _size: The number of points in this dataset
+    # Invariant: _size is an int >= 0.
+    #
+    # Attribute _rows: The positions of the points in _data (for a subset)
+    # Invariant: _rows is None or a 1D numpy array of _size ints, each a valid row
+    # of _data. If _rows is None, rows 0.._size-1 of _data are the points.
+    # Otherwise point i is row _rows[i], and _data has no spare capacity.
 
     # Part A
     # Getters for encapsulated attributes
@@ -85,24 +201,37 @@ class Dataset(object):
         """
         Returns the number of points in this dataset.
         """
-        if self._contents is None:
-            return 0
-        return len(self._contents)
+        return self._size
 
-    def getContents(self):
+    def getDtype(self):
+        """
+        Returns the type of number (a numpy dtype) stored in this dataset.
+        """
+        return self._data.dtype
+
+    def getContents(self, view=False):
         """
         Returns the contents of this dataset as a list of points.
 
-        This method returns the contents directly (not a copy). Any changes made
-        to this list will modify the dataset. If you want to access the dataset
-        but want to protect yourself from modifying the data, use getPoint()
-        instead.
+        The points are built fresh from the storage buffer, so changes to this
+        list (or to the points in it) do not modify the dataset. If you only
+        want a single point, use getPoint() instead.
+
+        If view is True, this method instead returns a read-only 2D numpy array
+        that shares memory with the dataset, so nothing is copied. The view is
+        only valid until the next point is added (adding points may move the
+        storage, after which the view still shows the old contents). For a subset
+        (see subset) the array is a read-only copy, as its points are not stored
+        next to each other.
+
+        Parameter view: whether to return a read-only view instead of a list
+        Precondition: view is a bool
         """
-        if self._contents is None:
-            return []
-        return self._contents.copy()
+        if view:
+            return _readonly(self._table(0, self._size))
+        return self._table(0, self._size).tolist()
 
-    def __init__(self, dim, contents=None):
+    def __init__(self, dim, contents=None, trusted=False, dtype=numpy.float64):
         """
         Initializes a dataset for the given point dimension.
 
@@ -111,28 +240,46 @@ class Dataset(object):
         If contents is None, the dataset starts off empty. The parameter contents
         is None by default.
 
+        Large tables are validated in bulk (see is_point_table). If trusted is
+        True, contents is not checked at all beyond its shape. Only use this for
+        data that is known to be good, such as the output of our own loaders.
+
         Parameter dim: The dimension of the dataset
         Precondition: dim is an int > 0
 
         Parameter contents: the dataset contents
         Precondition: contents is either None or it is a table of numbers (int
-        or float). If contents is not None, then contents is not empty, and the
-        number of columns is equal to dim.
+        or float), given as a list of points or a 2D numpy array. If contents is
+        not None, then contents is not empty, and the number of columns is equal
+        to dim.
+
+        Parameter trusted: whether to skip validating contents
+        Precondition: trusted is a bool
+
+        Parameter dtype: the type of number stored in the dataset
+        Precondition: dtype is one of DTYPES (float64 by default)
         """
         # Validate the dimension parameter
         assert isinstance(dim, int) and dim > 0
-        # Validate the contents parameter, if provided
-        if contents is not None:
-            assert is_point_list(contents)
+        assert isinstance(trusted, bool)
+        assert numpy.dtype(dtype) in DTYPES
 
         self._dimension = dim
+        self._rows = None
         # Initialize the dataset contents
         if contents is None:
-            self._contents = []
+            self._data = numpy.empty((0, dim), dtype=dtype)
+            self._size = 0
         else:
-            self._contents = contents.copy()
-
-    def getPoint(self, i):
+            # Validate (and convert) the contents in one pass
+            table = _as_table(contents, dim, trusted, dtype)
+            assert table is not None and table.shape[0] > 0
+            if isinstance(contents, numpy.ndarray) and numpy.may_share_memory(table, contents):
+                table = table.copy()
+            self._data = table
+            self._size = table.shape[0]
+
+    def getPoint(self, i, view=False):
         """
         Returns a COPY of the point at index i in this dataset.
 
@@ -140,26 +287,152 @@ class Dataset(object):
         ensure that we do not accidentally modify the dataset. That is the
         purpose of this method.
 
-        If you actually want to modify the dataset, use the method getContents().
-        That returns the list storing the dataset, and any changes to that list
-        will alter the dataset.
+        If view is True, this method instead returns a read-only 1D numpy array
+        that shares memory with the dataset (see getContents).
 
         Parameter i: the index position of the point
         Precondition: i is an int that refers to a valid position in 0..getSize()-1
+
+        Parameter view: whether to return a read-only view instead of a list
+        Precondition: view is a bool
         """
         # Validate the index parameter
         assert isinstance(i, int)
-        assert i < self.getSize()
+        assert -self.getSize() <= i < self.getSize()
+
+        # Negative indices count back from the last point, not the buffer end
+        if i < 0:
+            i += self._size
+        if self._rows is not None:
+            i = int(self._rows[i])
+        if view:
+            return _readonly(self._data[i])
+        return self._data[i].tolist()
+
+    def getPoints(self, indices):
+        """
+        Returns the points at the given indices as a read-only 2D numpy array.
+
+        Row i of the result is point indices[i]. The points are gathered into a
+        new array in one step (they are not views of the dataset), so this is
+        the way to get many points that are not next to each other.
+
+        Parameter indices: the positions of the points
+        Precondition: indices is a list or 1D numpy array of ints, each in the
+        range 0..getSize()-1
+        """
+        rows = numpy.asarray(indices, dtype=numpy.intp)
+        assert rows.ndim == 1
+        assert len(rows) == 0 or (rows.min() >= 0 and rows.max() < self._size)
+        if self._rows is not None:
+            rows = self._rows[rows]
+        return _readonly(self._data[rows])
+
+    def chunks(self, size=None):
+        """
+        Generates the contents of this dataset as consecutive blocks of points.
+
+        Each block is a pair (start, rows), where rows is a read-only 2D numpy
+        view of the points start..start+len(rows)-1 (see getContents). Code that
+        processes a dataset one block at a time only needs memory for a single
+        block, which matters for datasets too large to fit in memory. For a
+        subset, each block is a read-only copy of just that block.
+
+        Parameter size: the number of points per block (or None for a block of
+        about CHUNK_BYTES bytes)
+        Precondition: size is None or an int > 0
+        """
+        assert size is None or (isinstance(size, int) and size > 0)
+        if size is None:
+            size = max(1, CHUNK_BYTES // (self._dimension * self._data.itemsize))
+        for start in range(0, self._size, size):
+            stop = min(start + size, self._size)
+            yield start, _readonly(self._table(start, stop))
+
+    def _table(self, start, stop):
+        """
+        Returns the points start..stop-1 as a 2D numpy array.
+
+        This is a view of _data, unless this dataset is a subset. Then it is a
+        new array gathered from the rows of _data.
+
+        Parameter start: the position of the first point
+        Precondition: start is an int in 0..getSize()
+
+        Parameter stop: the position after the last point
+        Precondition: stop is an int in start..getSize()
+        """
+        if self._rows is None:
+            return self._data[start:stop]
+        return self._data[self._rows[start:stop]]
+
+    def slice(self, start, stop):
+        """
+        Returns a dataset of the points start..stop-1 of this one, WITHOUT copying.
+
+        The result shares the storage buffer of this dataset. Adding points to
+        either dataset never changes the points of the other (the slice moves to
+        a buffer of its own the first time that it grows).
+
+        Parameter start: the position of the first point
+        Precondition: start is an int in 0..getSize()
+
+        Parameter stop: the position after the last point
+        Precondition: stop is an int in start..getSize()
+        """
+        assert isinstance(start, int) and isinstance(stop, int)
+        assert 0 <= start <= stop <= self._size
+        if self._rows is not None:
+            return self._share(self._data, self._rows[start:stop])
+        return self._share(self._data[start:stop], None)
 
-        # Return a copy of the requested point
-        temp = self._contents
-        return temp[i].copy()
+    def subset(self, indices):
+        """
+        Returns a dataset of the points at the given indices, WITHOUT copying.
+
+        Point i of the result is point indices[i] of this dataset. The result
+        shares the storage buffer of this dataset, and only stores the indices
+        (see slice for what happens when points are added). Indices may repeat.
+
+        Parameter indices: the positions of the points to keep
+        Precondition: indices is a list or 1D numpy array of ints, each in the
+        range 0..getSize()-1
+        """
+        rows = numpy.asarray(indices, dtype=numpy.intp)
+        assert rows.ndim == 1
+        assert len(rows) == 0 or (rows.min() >= 0 and rows.max() < self._size)
+        if self._rows is not None:
+            rows = self._rows[rows]
+        return self._share(self._data, rows)
+
+    def _share(self, data, rows):
+        """
+        Returns a new Dataset over the given storage and row positions.
+
+        If rows is None, the points are all of the rows of data, and otherwise
+        they are the rows of data at the positions in rows. The new dataset has
+        no spare capacity, so it moves to a buffer of its own the first time it
+        grows.
+
+        Parameter data: The storage buffer to share
+        Precondition: data is a 2D numpy array with getDimension() columns
+
+        Parameter rows: The positions of the points in data (or None)
+        Precondition: rows is None or a 1D numpy array of valid rows of data
+        """
+        dset = Dataset.__new__(Dataset)
+        dset._dimension = self._dimension
+        dset._data = data
+        dset._rows = rows
+        dset._size = data.shape[0] if rows is None else len(rows)
+        return dset
 
     def addPoint(self, point):
         """
         Adds a COPY of point at the end of _contents.
 
         This method does not add the point directly. It adds a copy of the point.
+        If the storage buffer is full, its capacity is doubled first.
 
         Parameter point: The point to add to the dataset
         Precondition: point is a list of int/float. The length of point is equal
@@ -169,10 +442,126 @@ class Dataset(object):
         assert is_point(point)
         assert len(point) == self._dimension
 
-        # Add a copy of the point to the dataset
-        new_point = point.copy()
-        self._contents = self.getContents()
-        self._contents.append(new_point)
+        # Copy the point into the next free row of the buffer
+        self._reserve(self._size + 1)
+        self._data[self._size] = point
+        self._size += 1
+
+    def _reserve(self, capacity):
+        """
+        Ensures the storage buffer has room for at least capacity points.
+
+        When the buffer must grow, its capacity is (at least) doubled, and the
+        points in use are copied over to the new buffer. A subset always moves
+        to a buffer of its own (its points are not at the start of _data).
+
+        Parameter capacity: the number of points the buffer must hold
+        Precondition: capacity is an int >= 0
+        """
+        current = self._data.shape[0] if self._rows is None else self._size
+        if capacity <= current and self._rows is None:
+            return
+        capacity = max(capacity, 2 * current, 8)
+        data = numpy.empty((capacity, self._dimension), dtype=self._data.dtype)
+        data[:self._size] = self._table(0, self._size)
+        self._data = data
+        self._rows = None
+
+    def _trim(self):
+        """
+        Shrinks the storage buffer to the points in use.
+
+        The buffer is shrunk in place if nothing else refers to it (so the points
+        are not copied). Otherwise, the points are copied to a new buffer.
+        """
+        if self._rows is not None or self._data.shape[0] == self._size:
+            return
+        try:
+            self._data.resize((self._size, self._dimension))
+        except ValueError:
+            # Views of the buffer (or a buffer it does not own) must stay valid
+            self._data = self._data[:self._size].copy()
+
+    def addPoints(self, points, trusted=False):
+        """
+        Adds COPIES of all of the given points at the end of the dataset.
+
+        This is the bulk version of addPoint. A table with a known length (a list
+        of points or a 2D numpy array) is validated once and copied into the
+        storage buffer with at most one buffer growth. Any other iterable (such
+        as a generator) is consumed in blocks of BLOCK_ROWS points, each of which
+        is added the same way.
+
+        As with the initializer, trusted may be set to True to skip validating
+        points that are known to be good.
+
+        Parameter points: The points to add to the dataset
+        Precondition: points is a 2D numpy array, a list of points, or an iterable
+        of points. Every point has getDimension() numbers (int or float).
+
+        Parameter trusted: whether to skip validating points
+        Precondition: trusted is a bool
+        """
+        if not hasattr(points, '__len__'):
+            points = iter(points)
+            block = list(itertools.islice(points, BLOCK_ROWS))
+            while block:
+                self.addPoints(block, trusted)
+                block = list(itertools.islice(points, BLOCK_ROWS))
+            return
+        if len(points) == 0:
+            return
+
+        # Validate and convert the table in one pass
+        table = _as_table(points, self._dimension, trusted, self._data.dtype)
+        assert table is not None
+
+        # Copy the table into the buffer, growing it (at most) once
+        size = self._size + table.shape[0]
+        self._reserve(size)
+        self._data[self._size:size] = table
+        self._size = size
+
+    @classmethod
+    def fromArray(cls, array, dtype=numpy.float64):
+        """
+        Returns a new dataset holding a COPY of the rows of a 2D array.
+
+        The dimension of the dataset is the number of columns of array.
+
+        Parameter array: The dataset contents
+        Precondition: array is a 2D numpy array of numbers with at least one column
+
+        Parameter dtype: the type of number stored in the dataset
+        Precondition: dtype is one of DTYPES
+        """
+        assert isinstance(array, numpy.ndarray) and array.ndim == 2
+        assert array.shape[1] > 0
+        dset = cls(array.shape[1], dtype=dtype)
+        dset.addPoints(array)
+        return dset
+
+    @classmethod
+    def fromIterable(cls, dim, points, dtype=numpy.float64):
+        """
+        Returns a new dataset holding COPIES of the points in an iterable.
+
+        The iterable is only traversed once, so it may be a generator (e.g. one
+        producing the rows of a large file).
+
+        Parameter dim: The dimension of the dataset
+        Precondition: dim is an int > 0
+
+        Parameter points: The dataset contents
+        Precondition: points is an iterable of points, each with dim numbers
+
+        Parameter dtype: the type of number stored in the dataset
+        Precondition: dtype is one of DTYPES
+        """
+        assert isinstance(dim, int) and dim > 0
+        dset = cls(dim, dtype=dtype)
+        dset.addPoints(points)
+        return dset
 
     # Part B
     def __str__(self):
@@ -198,18 +587,266 @@ class Dataset(object):
 
         See the assignment instructions for more details.
         """
-        # Handle the case of an empty dataset
-        if self._contents == []:
-            return ''
-        # Build the string representation
-        total = '0: ['
-        for i in range(self.getSize()):
-            for j in range(len(self.getPoint(i))):
-                temp = self.getPoint(i)
-                total = total + str(float(temp[j]))
-                if j < (len(temp) - 1):
-                    total += ','
-            total += ']'
-            if i < (self.getSize() - 1):
-                total += '\n' + str(i + 1) + ': ['
-        return total
+        # Join the lines in one step (an empty dataset has no lines)
+        return '\n'.join(self.lines())
+
+    def lines(self):
+        """
+        Generates the lines of the string representation of this dataset.
+
+        Each line is a single point in the format of __str__ (without a newline),
+        such as '1: [3.0,4.0]'. The points are converted one block at a time
+        (see chunks), so this takes time linear in the size of the dataset, and
+        only needs memory for one block.
+        """
+        for start, rows in self.chunks():
+            # tolist converts to Python floats (the same as float()), and str of
+            # a list of floats is the format we want, once the spaces are removed
+            for i, point in enumerate(rows.tolist(), start):
+                yield str(i) + ': ' + str(point).replace(' ', '')
+
+    def write(self, file):
+        """
+        Writes the string representation of this dataset to an open text file.
+
+        This writes exactly str(self), but a line at a time (see lines), so it
+        never builds the whole string in memory.
+
+        Parameter file: The file to write to
+        Precondition: file is a text file (or file-like object) open for writing
+        """
+        first = True
+        for line in self.lines():
+            if not first:
+                file.write('\n')
+            file.write(line)
+            first = False
+
+    # Part C: Binary files
+    def save(self, filename):
+        """
+        Saves this dataset to a binary file that Dataset.load can reopen.
+
+        The file is a FILE_HEADER (holding the dtype, dimension and size) followed
+        by the points as raw little-endian numbers (of getDtype()) in row-major
+        order. The points
+        are written one block at a time (see chunks).
+
+        Parameter filename: The name of the file to write
+        Precondition: filename is a string
+        """
+        assert isinstance(filename, str)
+        dtype = self._data.dtype.newbyteorder('<')
+        with open(filename, 'wb') as file:
+            file.write(FILE_HEADER.pack(FILE_MAGIC, dtype.str.encode('ascii'),
+                                        self._dimension, self._size))
+            for start, rows in self.chunks():
+                file.write(rows.astype(dtype, copy=False).tobytes())
+
+    @staticmethod
+    def load(filename, mmap=True):
+        """
+        Returns the dataset saved in the given binary file (see save).
+
+        If mmap is True, the file is memory-mapped rather than read (see the class
+        MappedDataset). This takes the same (tiny) time however large the file is,
+        but the result cannot grow. If mmap is False, the points are read straight
+        into the storage buffer of a new Dataset.
+
+        Parameter filename: The name of a file written by save
+        Precondition: filename is a string naming a file written by save
+
+        Parameter mmap: whether to memory-map the file instead of reading it
+        Precondition: mmap is a bool
+        """
+        assert isinstance(filename, str)
+        with open(filename, 'rb') as file:
+            magic, dtype, dim, size = FILE_HEADER.unpack(file.read(FILE_HEADER.size))
+            assert magic == FILE_MAGIC, '%s is not a saved dataset' % repr(filename)
+            dtype = numpy.dtype(dtype.rstrip(b'\0').decode('ascii'))
+            assert dtype in DTYPES
+
+            if mmap:
+                return MappedDataset(filename, dim, FILE_HEADER.size, size, dtype)
+
+            dset = Dataset(dim, dtype=dtype)
+            dset._reserve(size)
+            count = file.readinto(dset._data[:size].reshape(-1).view(numpy.uint8))
+            assert count == size * dim * dset._data.itemsize, 'the file is truncated'
+            dset._size = size
+        return dset
+
+
+# TASK 1B: DATASETS LARGER THAN MEMORY
+class MappedDataset(Dataset):
+    """
+    A class representing a read-only dataset stored in a binary file.
+
+    The file holds the points as raw numbers (float64 by default) in row-major
+    order (one point after another), such as the output of numpy's tofile method. The file
+    is memory-mapped rather than read, so the dataset can be much larger than
+    memory. Only the parts of the file that are actually accessed are loaded,
+    and the operating system is free to drop them again afterwards.
+
+    Code that must see every point should use chunks() rather than getContents(),
+    as the latter copies the entire dataset into memory.
+
+    A mapped dataset cannot grow, so addPoint and addPoints are not supported.
+    """
+    # IMMUTABLE ATTRIBUTES (Fixed after initialization)
+    # Attribute _filename: The name of the file holding the points
+    # Invariant: _filename is a string
+    #
+    # Attribute _data is a read-only numpy memmap of the file, and _size is its
+    # number of rows (the capacity is exactly the size).
+
+    def getFilename(self):
+        """
+        Returns the name of the file holding this dataset.
+        """
+        return self._filename
+
+    def __init__(self, filename, dim, offset=0, size=None, dtype=numpy.float64):
+        """
+        Initializes a dataset that maps the points in the given file.
+
+        Parameter filename: The name of the file holding the points
+        Precondition: filename is a string naming an existing file
+
+        Parameter dim: The dimension of the dataset
+        Precondition: dim is an int > 0
+
+        Parameter offset: The position (in bytes) of the first point in the file
+        Precondition: offset is an int >= 0
+
+        Parameter size: The number of points (or None to use the whole file)
+        Precondition: size is None or an int >= 0. The file has room for size
+        points after offset.
+
+        Parameter dtype: the type of number stored in the file
+        Precondition: dtype is one of DTYPES
+        """
+        assert isinstance(filename, str)
+        assert isinstance(dim, int) and dim > 0
+        assert isinstance(offset, int) and offset >= 0
+        assert size is None or (isinstance(size, int) and size >= 0)
+        assert numpy.dtype(dtype) in DTYPES
+
+        itemsize = numpy.dtype(dtype).itemsize
+        if size is None:
+            available = os.path.getsize(filename) - offset
+            assert available >= 0 and available % (dim * itemsize) == 0
+            size = available // (dim * itemsize)
+
+        self._filename = filename
+        self._dimension = dim
+        self._rows = None
+        self._size = size
+        if size == 0:
+            # numpy cannot map an empty region of a file
+            self._data = numpy.empty((0, dim), dtype=dtype)
+        else:
+            self._data = numpy.memmap(filename, dtype=dtype, mode='r',
+                                      offset=offset, shape=(size, dim))
+
+    def _reserve(self, capacity):
+        """
+        Fails unless the dataset already has room for capacity points.
+
+        Parameter capacity: the number of points the buffer must hold
+        Precondition: capacity is an int <= getSize()
+        """
+        assert capacity <= self._size, 'a MappedDataset cannot grow'
+
+
+# TASK 1C: LOADING DATASETS
+def load_csv(filename, columns=None, header=None, delimiter=',', dtype=numpy.float64):
+    """
+    Returns a new dataset with the points in the given CSV file.
+
+    The file is parsed BLOCK_ROWS lines at a time, and each block is copied
+    straight into the storage buffer of the dataset. So the only full copy of the
+    data in memory is the dataset itself (there is never a list of all the rows).
+    The buffer is sized from the length of the file after the first block, so it
+    rarely needs to grow while loading, and any room left over at the end is
+    given back.
+
+    Parameter filename: The name of the CSV file
+    Precondition: filename is a string naming a file whose (selected) columns
+    are all numbers, apart from any header lines. The file must have at least
+    one point (with or without columns), since an empty dataset cannot be
+    clustered.
+
+    Parameter columns: The columns to load, in order (or None for all columns)
+    Precondition: columns is None or a nonempty list of column positions (int)
+
+    Parameter header: The number of header lines to skip (or None to skip the
+    first line only if it is not all numbers)
+    Precondition: header is None or an int >= 0
+
+    Parameter delimiter: The string separating the columns
+    Precondition: delimiter is a nonempty string
+
+    Parameter dtype: the type of number stored in the dataset
+    Precondition: dtype is one of DTYPES
+    """
+    assert isinstance(filename, str)
+    assert columns is None or (isinstance(columns, list) and len(columns) > 0)
+    assert header is None or (isinstance(header, int) and header >= 0)
+    assert isinstance(delimiter, str) and delimiter != ''
+
+    dset = None
+    if columns is not None:
+        dset = Dataset(len(columns), dtype=dtype)
+
+    with open(filename) as file:
+        first = file.readline()
+        if header is None:
+            header = 0 if _is_number_row(first, delimiter, columns) else 1
+        pending = [first]
+        if header > 0:
+            pending = []
+            for i in range(header - 1):
+                file.readline()
+
+        lines = pending + list(itertools.islice(file, BLOCK_ROWS - len(pending)))
+        while lines:
+            table = numpy.loadtxt(lines, delimiter=delimiter, usecols=columns,
+                                  dtype=dtype, ndmin=2)
+            if dset is None:
+                dset = Dataset(table.shape[1], dtype=dtype)
+            if dset.getSize() == 0:
+                # Estimate the number of points from the bytes per line so far
+                used = sum(len(line) for line in lines)
+                total = os.path.getsize(filename)
+                dset._reserve(int(len(lines) * total / max(used, 1) * 1.05) + 1)
+            dset.addPoints(table, trusted=True)
+            lines = list(itertools.islice(file, BLOCK_ROWS))
+
+    assert dset is not None and dset.getSize() > 0, 'the file has no points'
+    dset._trim()
+    return dset
+
+
+def _is_number_row(line, delimiter, columns):
+    """
+    Returns True if the (selected) entries of a line of a CSV file are all numbers
+
+    Parameter line: the line to check
+    Precondition: line is a string
+
+    Parameter delimiter: The string separating the columns
+    Precondition: delimiter is a nonempty string
+
+    Parameter columns: The columns to check (or None for all columns)
+    Precondition: columns is None or a list of column positions (int)
+    """
+    entries = line.strip().split(delimiter)
+    if columns is not None:
+        entries = [entries[i] for i in columns if -len(entries) <= i < len(entries)]
+    try:
+        for entry in entries:
+            float(entry)
+    except ValueError:
+        return False
+    return True
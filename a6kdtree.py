@@ -0,0 +1,315 @@
+"""
+A kd-tree over the points of a dataset, for k-Means clustering
+
+The tree is used by the 'kdtree' mode of Algorithm (see a6accel.Filter), which
+labels the points with the filtering algorithm of Kanungo et al. Each node of
+the tree has a box around its points. The centroids that cannot be nearest to
+any point in the box are filtered out as the node is visited, and once only one
+centroid is left, every point below the node gets its label at once.
+"""
+
+import numpy
+
+# For accessing the previous parts of the assignment
+import a6dataset
+import a6cluster
+
+# The largest number of points in a leaf of the tree
+LEAF_SIZE = 64
+
+# A node with at most this many leaves of points is not split any further if
+# filtering it kept all the candidates of its parent
+STALL_LEAVES = 4
+
+
+class KDTree(object):
+    """
+    A class representing a kd-tree over the points of a dataset.
+
+    The tree is built once, by splitting the widest side of the box around the
+    points at the median, until each leaf has at most LEAF_SIZE points. The tree
+    does not copy the points. Instead, it keeps a permutation of the indices of
+    the points, so that the points below each node are a range of it.
+
+    The nodes are numbered from 0 (the root), and stored in arrays rather than
+    objects, so the tree takes a few numbers for each node.
+    """
+    # Attribute _points: The points of the dataset
+    # Invariant: _points is a read-only 2D numpy array with a row for each point
+    #
+    # Attribute _order: The indices of the points, in the order of the tree
+    # Invariant: _order is a 1D numpy intp array that is a permutation of the
+    # indices of the points
+    #
+    # Attribute _start: The start of the points of each node in _order
+    # Invariant: _start is a 1D numpy intp array with an entry for each node
+    #
+    # Attribute _stop: The end of the points of each node in _order
+    # Invariant: _stop is a 1D numpy intp array with an entry for each node. The
+    # points below node i are _order[_start[i]:_stop[i]].
+    #
+    # Attribute _low: The lower corner of the box of each node
+    # Invariant: _low is a 2D float64 numpy array with a row for each node. Row i
+    # is the smallest value of each coordinate of the points below node i.
+    #
+    # Attribute _high: The upper corner of the box of each node
+    # Invariant: _high is a 2D float64 numpy array the same shape as _low. Row i
+    # is the largest value of each coordinate of the points below node i.
+    #
+    # Attribute _leaf: The largest number of points in a leaf
+    # Invariant: _leaf is an int > 0
+    #
+    # Attribute _left: The first child of each node
+    # Invariant: _left is a 1D numpy intp array with an entry for each node. It is
+    # -1 for a leaf. Otherwise, the children of node i are _left[i] and
+    # _left[i]+1, which split its points in two.
+
+    def getSize(self):
+        """
+        Returns the number of points in this tree.
+        """
+        return len(self._order)
+
+    def getNodes(self):
+        """
+        Returns the number of nodes in this tree.
+        """
+        return len(self._start)
+
+    def __init__(self, dset, leaf=LEAF_SIZE):
+        """
+        Initializes a new kd-tree over the points of the given dataset.
+
+        Building the tree takes time proportional to n log n for a dataset of n
+        points. The tree keeps a view of the points of the dataset, so the
+        dataset should not change while the tree is in use.
+
+        Parameter dset: the dataset to build the tree over
+        Precondition: dset is a non-empty Dataset
+
+        Parameter leaf: the largest number of points in a leaf
+        Precondition: leaf is an int > 0
+        """
+        assert dset.getSize() > 0
+        assert isinstance(leaf, int) and leaf > 0
+        points = dset.getContents(view=True)
+        order = numpy.arange(len(points))
+        start, stop, left, low, high = [0], [len(points)], [], [], []
+
+        # Split the nodes in the order they were made (so children follow parents)
+        node = 0
+        while node < len(start):
+            first, last = start[node], stop[node]
+            rows = points[order[first:last]]
+            low.append(rows.min(axis=0))
+            high.append(rows.max(axis=0))
+            left.append(-1)
+
+            side = int(numpy.argmax(high[node] - low[node]))
+            if last - first > leaf and high[node][side] > low[node][side]:
+                half = (last - first) // 2
+                split = numpy.argpartition(rows[:, side], half)
+                order[first:last] = order[first:last][split]
+                left[node] = len(start)
+                start.extend([first, first + half])
+                stop.extend([first + half, last])
+            node += 1
+
+        self._points = points
+        self._leaf = leaf
+        self._order = order
+        self._start = numpy.array(start, dtype=numpy.intp)
+        self._stop = numpy.array(stop, dtype=numpy.intp)
+        self._low = numpy.array(low, dtype=numpy.float64)
+        self._high = numpy.array(high, dtype=numpy.float64)
+        self._left = numpy.array(left, dtype=numpy.intp)
+
+    def filter(self, centroids, labels, margin=0.0):
+        """
+        Labels each point with its nearest centroid, and returns the distances computed.
+
+        This is the filtering algorithm. Each node is visited with the centroids
+        that might be nearest to one of its points (all of them, at the root).
+        The candidate nearest the middle of the box is found, and any other
+        candidate that is farther than it from every corner of the box, by more
+        than margin, is dropped. When one candidate is left, all the points of
+        the node get its label. The points of a leaf with several candidates are
+        measured (see _measure), and so are those of a small node (at most
+        STALL_LEAVES leaves of points) where no candidate was dropped, as the
+        levels below it rarely drop enough to pay for filtering them.
+
+        The tree is visited a level at a time, with all the nodes of a level
+        filtered together, so there is no Python code for each node. Ties go to
+        the first centroid, as in Algorithm._partition, so the labels are the
+        same as measuring every distance. The value returned is the number of
+        point-to-centroid distances computed.
+
+        Parameter centroids: the centroids to label the points with
+        Precondition: centroids is a 2D numpy array with at least one row
+
+        Parameter labels: the array to store the labels in
+        Precondition: labels is a 1D numpy array of ints with an entry for each
+        point
+
+        Parameter margin: the rounding allowance (in squared distance)
+        Precondition: margin is a float >= 0
+        """
+        exact = numpy.asarray(centroids, dtype=self._points.dtype)
+        centers = exact.astype(numpy.float64)
+        k = len(centers)
+
+        # The nodes labeled as a whole, and the nodes whose points must be measured
+        whole, labeled, leaves, remain = [], [], [], []
+        nodes = numpy.zeros(1, dtype=numpy.intp)
+        cands = numpy.ones((1, k), dtype=bool)
+        before = numpy.full(1, k + 1)
+        while len(nodes):
+            if k > 1:
+                cands = self._prune(nodes, centers, cands, margin)
+            after = cands.sum(axis=1)
+            single = after == 1
+            whole.append(nodes[single])
+            labeled.append(cands[single].argmax(axis=1))
+
+            # Small nodes where filtering stopped paying off are measured at once
+            inner = self._left[nodes] >= 0
+            small = self._stop[nodes] - self._start[nodes] <= STALL_LEAVES * self._leaf
+            inner &= ~(small & (after == before))
+            leaves.append(nodes[~single & ~inner])
+            remain.append(cands[~single & ~inner])
+            split = ~single & inner
+            child = self._left[nodes[split]]
+            nodes = numpy.concatenate((child, child + 1))
+            cands = numpy.concatenate((cands[split], cands[split]))
+            before = numpy.concatenate((after[split], after[split]))
+
+        whole = numpy.concatenate(whole)
+        index = self._order[self._ranges(whole)]
+        labels[index] = numpy.repeat(numpy.concatenate(labeled),
+                                     self._stop[whole] - self._start[whole])
+
+        return self._measure(numpy.concatenate(leaves), numpy.concatenate(remain),
+                             exact, labels)
+
+    def _measure(self, leaves, cands, centroids, labels):
+        """
+        Labels the points of the nodes by measuring them against their candidates.
+
+        Each point is measured against the candidates of its node only (with
+        a6cluster.squared_distances, as Algorithm._nearest does). The nodes with
+        the same number of candidates are measured together, as one array with a
+        row for each point and a column for each candidate, so there is no Python
+        code for each node. Ties go to the first centroid. The value returned is the
+        number of distances computed.
+
+        Parameter leaves: the nodes to measure (mostly leaves)
+        Precondition: leaves is a 1D numpy array of ints, the numbers of nodes with
+        no points in common
+
+        Parameter cands: the candidates for each node
+        Precondition: cands is a 2D numpy array of bools with a row for each node
+        and a column for each centroid
+
+        Parameter centroids: all the centroids
+        Precondition: centroids is a 2D numpy array of the number type of the points
+
+        Parameter labels: the array to store the labels in
+        Precondition: labels is a 1D numpy array of ints with an entry for each
+        point
+        """
+        sizes = self._stop[leaves] - self._start[leaves]
+        counts = cands.sum(axis=1)
+        total = 0
+        for count in numpy.unique(counts).tolist():
+            group = counts == count
+            # The candidates of each node (in order), and the node of each point
+            chosen = numpy.nonzero(cands[group])[1].reshape(-1, count)
+            owner = numpy.repeat(numpy.arange(len(chosen)), sizes[group])
+            index = self._order[self._ranges(leaves[group])]
+            total += len(index) * count
+
+            # Measure the points a block at a time (of float64 differences)
+            size = max(1, a6dataset.CHUNK_BYTES // (count * centroids.shape[1] * 8))
+            for start in range(0, len(index), size):
+                part = slice(start, start + size)
+                pick = chosen[owner[part]]
+                dist = a6cluster.squared_distances(self._points[index[part]][:, None, :],
+                                                   centroids[pick])
+                # The nearest candidate of each point, comparing the roots as
+                # Algorithm._nearest does (argmin takes the first tie)
+                nearest = numpy.sqrt(dist, out=dist).argmin(axis=1)
+                labels[index[part]] = pick[numpy.arange(len(pick)), nearest]
+        return total
+
+    def _ranges(self, nodes):
+        """
+        Returns a 1D numpy array of the positions (in _order) of the points below the nodes.
+
+        Parameter nodes: the nodes to look up
+        Precondition: nodes is a 1D numpy array of ints, the numbers of nodes with
+        no points in common
+        """
+        sizes = self._stop[nodes] - self._start[nodes]
+        offset = numpy.cumsum(sizes) - sizes
+        return numpy.repeat(self._start[nodes] - offset, sizes) + numpy.arange(sizes.sum())
+
+    def _prune(self, nodes, centers, cands, margin):
+        """
+        Returns the candidates that might be nearest to a point in the box of each node.
+
+        For each node, the candidate z* nearest the middle of its box is found
+        (the centroid is kept no matter what). For each other candidate z, the
+        corner of the box in the direction from z* to z is the one where z does
+        best against z*. If z is farther than z* from that corner (by more than
+        margin), it is farther from every point of the box, and is dropped.
+
+        Only the pairs of a node and one of its candidates are measured (not
+        every centroid for every node), a batch of pairs at a time, so the
+        temporary arrays take about a6dataset.CHUNK_BYTES.
+
+        Parameter nodes: the nodes to check
+        Precondition: nodes is a 1D numpy array of ints, the numbers of nodes
+
+        Parameter centers: all the centroids
+        Precondition: centers is a 2D float64 numpy array
+
+        Parameter cands: the candidates for each node
+        Precondition: cands is a 2D numpy array of bools with a row for each node
+        and a column for each centroid, with at least one True in each row
+
+        Parameter margin: the rounding allowance (in squared distance)
+        Precondition: margin is a float >= 0
+        """
+        # The pairs of a node (by position in nodes) and a candidate, by node
+        where, which = numpy.nonzero(cands)
+        counts = cands.sum(axis=1)
+        first = numpy.cumsum(counts) - counts
+        middle = (self._low[nodes] + self._high[nodes]) / 2
+
+        # The candidate nearest the middle of each box (the first of any ties)
+        dist = numpy.empty(len(where))
+        size = max(1, a6dataset.CHUNK_BYTES // (24 * centers.shape[1]))
+        for start in range(0, len(where), size):
+            part = slice(start, start + size)
+            diff = centers[which[part]] - middle[where[part]]
+            dist[part] = numpy.einsum('ij,ij->i', diff, diff)
+        least = numpy.minimum.reduceat(dist, first)
+        winner = numpy.where(dist == numpy.repeat(least, counts), which, len(centers))
+        best = numpy.minimum.reduceat(winner, first)
+
+        keep = numpy.empty(len(where), dtype=bool)
+        for start in range(0, len(where), size):
+            part = slice(start, start + size)
+            node = nodes[where[part]]
+            other = centers[which[part]]
+            center = centers[best[where[part]]]
+            corner = numpy.where(other > center, self._high[node], self._low[node])
+            diff = other - corner
+            far = numpy.einsum('ij,ij->i', diff, diff)
+            diff = center - corner
+            near = numpy.einsum('ij,ij->i', diff, diff)
+            keep[part] = far <= near + margin
+
+        result = numpy.zeros_like(cands)
+        result[where[keep], which[keep]] = True
+        return result
@@ -3,15 +3,17 @@ Unit tests for k-means clustering
 """
 
 import introcs
-import random
 import numpy
 import tools
+import tempfile
+import io
 import os, os.path
 
 # The modules to test.
 import a6dataset
 import a6cluster
 import a6algorithm
+import a6kdtree
 
 # Helper function for latter tests
 TEST_FILE = 'data/candy.csv'
@@ -73,6 +75,44 @@ def test_point_list():
     print()
 
 
+def test_point_table():
+    print('  Testing function is_point_table')
+
+    # TEST CASE 1
+    items = [[0.0,0.0,0.0],[1.0,0.0,0.0],[0.0,1.0,0.0],[0.0,0.0,1.0]]
+    introcs.assert_true(a6dataset.is_point_table(items))
+    introcs.assert_true(a6dataset.is_point_table(items,3))
+    introcs.assert_false(a6dataset.is_point_table(items,2))
+
+    # TEST CASE 2
+    items = numpy.array([[0,1],[2,3]])
+    introcs.assert_true(a6dataset.is_point_table(items,2))
+    introcs.assert_false(a6dataset.is_point_table(numpy.array([0.0,1.0])))
+    introcs.assert_false(a6dataset.is_point_table(numpy.array([['0.0','1.0']])))
+
+    # TEST CASE 3 (large tables are checked in bulk)
+    items = [[float(x),0.0] for x in range(5000)]
+    introcs.assert_true(a6dataset.is_point_table(items,2))
+    items[4000] = [0.0,'0.0']
+    introcs.assert_false(a6dataset.is_point_table(items,2))
+    items[4000] = [0.0]
+    introcs.assert_false(a6dataset.is_point_table(items,2))
+
+    # Rows that are not lists fail at any length
+    for size in (10, 5000):
+        items = [(float(x),0.0) for x in range(size)]
+        introcs.assert_false(a6dataset.is_point_table(items,2))
+        items = [[float(x),0.0] for x in range(size)]
+        items[-1] = numpy.array([0.0,0.0])
+        introcs.assert_false(a6dataset.is_point_table(items,2))
+
+    # TEST CASE 4
+    introcs.assert_false(a6dataset.is_point_table(4))
+    introcs.assert_false(a6dataset.is_point_table([[0.0,1.0],2]))
+    print('  function is_point_table appears correct')
+    print()
+
+
 def test_dataset_a():
     """
     Tests Part A of the Dataset class.
@@ -119,6 +159,15 @@ def test_dataset_a():
     items.append(extra)
     assert_point_sets_equal(items,dset2.getContents())
     introcs.assert_false(dset2.getPoint(-1) is extra)
+
+    # Add enough points to force the storage to grow several times
+    dset3 = a6dataset.Dataset(2)
+    for i in range(50):
+        dset3.addPoint([i,-i])
+    introcs.assert_equals(50,dset3.getSize())
+    assert_points_equal([0.0,0.0],dset3.getPoint(0))
+    assert_points_equal([17.0,-17.0],dset3.getPoint(17))
+    assert_points_equal([49.0,-49.0],dset3.getPoint(-1))
     print('    Method Dataset.addPoint looks okay')
     print('  Part A of class Dataset appears correct')
     print()
@@ -160,10 +209,282 @@ def test_dataset_b():
     introcs.assert_equals('',str(dset5))
 
     print('    Method Dataset.__str__ looks okay')
+
+    # TEST CASE 6 (lines and write)
+    introcs.assert_equals(['0: [1.0,0.5,2.0]','1: [1.5,-3.0,4.0]'],list(dset4.lines()))
+    introcs.assert_equals([],list(dset5.lines()))
+    file = io.StringIO()
+    dset4.write(file)
+    introcs.assert_equals(str(dset4),file.getvalue())
+    print('    Methods Dataset.lines and Dataset.write look okay')
     print('  Part B of class Dataset appears correct')
     print()
 
 
+def test_dataset_c():
+    """
+    Tests the bulk ingestion methods of the Dataset class.
+    """
+    print('  Testing bulk methods of class Dataset')
+
+    # TEST CASE 1 (addPoints with a list)
+    items = [[0.0,0.0,0.0],[1.0,0.0,0.0],[0.0,1.0,0.0],[0.0,0.0,1.0]]
+    dset1 = a6dataset.Dataset(3,items[:1])
+    dset1.addPoints(items[1:])
+    introcs.assert_equals(4,dset1.getSize())
+    assert_point_sets_equal(items,dset1.getContents())
+
+    # TEST CASE 2 (addPoints with an array and a generator)
+    dset1.addPoints(numpy.array([[1,2,3]]))
+    dset1.addPoints([x,x,x] for x in range(3))
+    introcs.assert_equals(8,dset1.getSize())
+    assert_points_equal([1.0,2.0,3.0],dset1.getPoint(4))
+    assert_points_equal([2.0,2.0,2.0],dset1.getPoint(7))
+    print('    Method Dataset.addPoints looks okay')
+
+    # TEST CASE 3 (fromArray)
+    array = numpy.array([[1.0,0.5],[1.5,-3.0]])
+    dset2 = a6dataset.Dataset.fromArray(array)
+    introcs.assert_equals(2,dset2.getDimension())
+    assert_point_sets_equal([[1.0,0.5],[1.5,-3.0]],dset2.getContents())
+    # Make sure array is COPIED
+    array[0,0] = 9.0
+    assert_points_equal([1.0,0.5],dset2.getPoint(0))
+
+    # TEST CASE 4 (fromIterable)
+    dset3 = a6dataset.Dataset.fromIterable(2,([x,-x] for x in range(10000)))
+    introcs.assert_equals(10000,dset3.getSize())
+    assert_points_equal([9999.0,-9999.0],dset3.getPoint(-1))
+    print('    Methods Dataset.fromArray and Dataset.fromIterable look okay')
+
+    # TEST CASE 5 (trusted initialization)
+    dset4 = a6dataset.Dataset(2,numpy.array([[1.0,0.5],[1.5,-3.0]]),trusted=True)
+    introcs.assert_equals(2,dset4.getSize())
+    assert_point_sets_equal([[1.0,0.5],[1.5,-3.0]],dset4.getContents())
+    print('    Trusted initialization looks okay')
+    print('  Bulk methods of class Dataset appear correct')
+    print()
+
+
+def test_dataset_d():
+    """
+    Tests the read-only views of the Dataset class.
+    """
+    print('  Testing views of class Dataset')
+
+    items = [[0.0,0.0,0.0],[1.0,0.0,0.0],[0.0,1.0,0.0],[0.0,0.0,1.0]]
+    dset = a6dataset.Dataset(3,items)
+
+    # TEST CASE 1 (getContents)
+    rows = dset.getContents(view=True)
+    introcs.assert_equals((4,3),rows.shape)
+    assert_point_sets_equal(items,rows.tolist())
+    introcs.assert_false(rows.flags.writeable)
+
+    # TEST CASE 2 (getPoint)
+    point = dset.getPoint(2,view=True)
+    assert_points_equal([0.0,1.0,0.0],point.tolist())
+    introcs.assert_false(point.flags.writeable)
+    # Views cannot be used to modify the dataset
+    try:
+        point[0] = 5.0
+        introcs.quit_with_error('Dataset.getPoint returned a writeable view')
+    except ValueError:
+        pass
+    assert_points_equal([0.0,1.0,0.0],dset.getPoint(2))
+    print('    Read-only views look okay')
+    print('  Views of class Dataset appear correct')
+    print()
+
+
+def test_dataset_subsets():
+    """
+    Tests the methods Dataset.slice and Dataset.subset.
+    """
+    print('  Testing subsets of class Dataset')
+    items = [[0.0,0.0],[0.0,1.0],[2.0,0.0],[1.0,3.0],[4.0,0.0],[0.0,5.0]]
+    dset = a6dataset.Dataset(2,items)
+
+    # TEST CASE 1 (slice shares the storage)
+    part = dset.slice(1,4)
+    introcs.assert_equals(3,part.getSize())
+    assert_point_sets_equal(items[1:4],part.getContents())
+    introcs.assert_true(numpy.shares_memory(part.getContents(view=True),
+                                            dset.getContents(view=True)))
+
+    # Growing a slice does not change the original
+    part.addPoint([9.0,9.0])
+    assert_points_equal([9.0,9.0],part.getPoint(3))
+    assert_points_equal([4.0,0.0],dset.getPoint(4))
+    print('    Method Dataset.slice looks okay')
+
+    # TEST CASE 2 (subset)
+    part = dset.subset([5,0,3,0])
+    introcs.assert_equals(4,part.getSize())
+    assert_points_equal([0.0,5.0],part.getPoint(0))
+    assert_points_equal([0.0,0.0],part.getPoint(-1))
+    introcs.assert_equals('0: [0.0,5.0]\n1: [0.0,0.0]\n2: [1.0,3.0]\n3: [0.0,0.0]',str(part))
+
+    # Subsets of subsets (and slices of subsets)
+    assert_point_sets_equal([[1.0,3.0],[0.0,5.0]],part.subset([2,0]).getContents())
+    assert_point_sets_equal([[0.0,0.0],[1.0,3.0]],part.slice(1,3).getContents())
+
+    # Growing a subset does not change the original
+    part.addPoint([9.0,9.0])
+    introcs.assert_equals(5,part.getSize())
+    introcs.assert_equals(6,dset.getSize())
+    print('    Method Dataset.subset looks okay')
+    print('  Subsets of class Dataset appear correct')
+    print()
+
+
+def test_dataset_mapped():
+    """
+    Tests the MappedDataset class.
+    """
+    print('  Testing class MappedDataset')
+    items = [[0.5,0.5,0.5],[0.5,0.6,0.6],[0.6,0.5,0.6],[0.5,0.6,0.5],[0.5,0.4,0.5],[0.5,0.4,0.4]]
+    filename = os.path.join(tempfile.mkdtemp(),'items.bin')
+    numpy.array(items).tofile(filename)
+
+    # TEST CASE 1 (the file is mapped correctly)
+    dset = a6dataset.MappedDataset(filename,3)
+    introcs.assert_equals(3,dset.getDimension())
+    introcs.assert_equals(6,dset.getSize())
+    assert_point_sets_equal(items,dset.getContents())
+    assert_points_equal(items[4],dset.getPoint(4))
+    print('    Mapped initialization looks okay')
+
+    # TEST CASE 2 (chunks cover the dataset in order)
+    blocks = list(dset.chunks(4))
+    introcs.assert_equals([0,4],[start for start, rows in blocks])
+    assert_point_sets_equal(items[4:],blocks[1][1].tolist())
+    print('    Method Dataset.chunks looks okay')
+
+    # TEST CASE 3 (clustering matches the in-memory dataset)
+    km = a6algorithm.Algorithm(dset, 2, [1, 3])
+    km.step()
+    km.step()
+    assert_points_equal([8./15, 17./30, 17./30], km.getClusters()[0].getCentroid())
+    introcs.assert_equals(set([1, 2, 3]), set(km.getClusters()[0].getIndices()))
+    assert_points_equal([0.5, 13./30, 14./30], km.getClusters()[1].getCentroid())
+    introcs.assert_equals(set([0, 4, 5]), set(km.getClusters()[1].getIndices()))
+    print('    Clustering a mapped dataset looks okay')
+    print('  Class MappedDataset appears correct')
+    print()
+
+
+def test_dataset_files():
+    """
+    Tests the methods Dataset.save and Dataset.load.
+    """
+    print('  Testing binary files of class Dataset')
+    items = [[1,0.5,2],[1.5,-3,4.0],[0.0,0.0,1.0]]
+    dset = a6dataset.Dataset(3,items)
+    filename = os.path.join(tempfile.mkdtemp(),'items.dset')
+    dset.save(filename)
+
+    # TEST CASE 1 (mapped)
+    dset1 = a6dataset.Dataset.load(filename)
+    introcs.assert_true(isinstance(dset1,a6dataset.MappedDataset))
+    introcs.assert_equals(3,dset1.getDimension())
+    assert_point_sets_equal(items,dset1.getContents())
+
+    # TEST CASE 2 (read into memory, so it can grow)
+    dset2 = a6dataset.Dataset.load(filename,mmap=False)
+    introcs.assert_false(isinstance(dset2,a6dataset.MappedDataset))
+    assert_point_sets_equal(items,dset2.getContents())
+    dset2.addPoint([1.0,1.0,1.0])
+    introcs.assert_equals(4,dset2.getSize())
+
+    # TEST CASE 3 (saving a mapped dataset gives the same file)
+    copy = filename+'.copy'
+    dset1.save(copy)
+    with open(filename,'rb') as file1, open(copy,'rb') as file2:
+        introcs.assert_equals(file1.read(),file2.read())
+    print('    Methods Dataset.save and Dataset.load look okay')
+    print('  Binary files of class Dataset appear correct')
+    print()
+
+
+def test_dataset_dtype():
+    """
+    Tests float32 datasets.
+    """
+    print('  Testing float32 datasets')
+    items = [[0.5,0.5,0.5],[0.5,0.6,0.6],[0.6,0.5,0.6],[0.5,0.6,0.5],[0.5,0.4,0.5],[0.5,0.4,0.4]]
+
+    # TEST CASE 1 (storage)
+    dset = a6dataset.Dataset(3,items,dtype=numpy.float32)
+    introcs.assert_equals(numpy.float32,dset.getDtype())
+    assert_point_sets_equal(items,dset.getContents())
+    dset.addPoint([1,2,3])
+    introcs.assert_equals(numpy.float32,dset.getContents(view=True).dtype)
+    print('    float32 storage looks okay')
+
+    # TEST CASE 2 (files keep the dtype)
+    filename = os.path.join(tempfile.mkdtemp(),'items.dset')
+    dset.save(filename)
+    introcs.assert_equals(numpy.float32,a6dataset.Dataset.load(filename).getDtype())
+    introcs.assert_equals(numpy.float32,a6dataset.Dataset.load(filename,mmap=False).getDtype())
+    print('    float32 files look okay')
+
+    # TEST CASE 3 (clustering gives the same answer as float64)
+    dset = a6dataset.Dataset(3,items,dtype=numpy.float32)
+    km = a6algorithm.Algorithm(dset, 2, [1, 3])
+    km.run(10)
+    assert_points_equal([8./15, 17./30, 17./30], km.getClusters()[0].getCentroid())
+    introcs.assert_equals(set([1, 2, 3]), set(km.getClusters()[0].getIndices()))
+    assert_points_equal([0.5, 13./30, 14./30], km.getClusters()[1].getCentroid())
+    introcs.assert_equals(set([0, 4, 5]), set(km.getClusters()[1].getIndices()))
+    print('    float32 clustering looks okay')
+    print('  float32 datasets appear correct')
+    print()
+
+
+def test_load_csv():
+    """
+    Tests the function load_csv.
+    """
+    print('  Testing function load_csv')
+
+    # TEST CASE 1 (matches the provided loader)
+    file = os.path.join(os.path.split(__file__)[0],TEST_FILE)
+    dset = a6dataset.load_csv(file)
+    introcs.assert_equals(4,dset.getDimension())
+    assert_point_sets_equal(tools.data_for_file(file),dset.getContents())
+
+    # TEST CASE 2 (header lines and column selection)
+    filename = os.path.join(tempfile.mkdtemp(),'items.csv')
+    with open(filename,'w') as file:
+        file.write('name,x,y,z\n')
+        for i in range(10000):
+            file.write('p%d,%d,0.5,%d\n' % (i,i,-i))
+    dset = a6dataset.load_csv(filename,columns=[1,3])
+    introcs.assert_equals(2,dset.getDimension())
+    introcs.assert_equals(10000,dset.getSize())
+    assert_points_equal([0.0,0.0],dset.getPoint(0))
+    assert_points_equal([9999.0,-9999.0],dset.getPoint(-1))
+    introcs.assert_equals((10000,2),dset.getContents(view=True).shape)
+    dset = a6dataset.load_csv(filename,columns=[2],header=2)
+    introcs.assert_equals(9999,dset.getSize())
+    introcs.assert_equals(1,dset.getDimension())
+    assert_points_equal([0.5],dset.getPoint(0))
+    assert_points_equal([0.5],dset.getContents()[-1])
+
+    # TEST CASE 3 (a file with no points fails, with or without columns)
+    with open(filename,'w') as file:
+        file.write('name,x,y,z\n')
+    for columns in (None, [1,3]):
+        try:
+            a6dataset.load_csv(filename,columns=columns)
+            introcs.quit_with_error('load_csv accepted a file with no points')
+        except AssertionError:
+            pass
+    print('  function load_csv appears correct')
+    print()
+
+
 def test_cluster_a():
     """
     Tests Part A of the Cluster class assignment.
@@ -193,6 +514,9 @@ def test_cluster_a():
     # Make sure we can handle duplicates!
     cluster1.addIndex(1)
     introcs.assert_equals([1,0],cluster1.getIndices())
+    introcs.assert_true(cluster1.hasIndex(0))
+    introcs.assert_true(cluster1.hasIndex(1))
+    introcs.assert_false(cluster1.hasIndex(2))
 
     print('    Method Cluster.addIndex look okay')
 
@@ -202,11 +526,56 @@ def test_cluster_a():
     assert_points_equal(extra[1],contents[0])
     assert_points_equal(extra[0],contents[1])
 
+    # Lazy contents
+    contents = cluster1.getContents(view=True)
+    introcs.assert_equals((2,3),contents.shape)
+    introcs.assert_false(contents.flags.writeable)
+    assert_points_equal(extra[1],contents[0].tolist())
+    blocks = list(cluster1.chunks())
+    introcs.assert_equals(1,len(blocks))
+    assert_point_sets_equal(extra,blocks[0].tolist())
+
     print('    Method Cluster.getContents look okay')
 
     # And clear it
     cluster1.clear()
     introcs.assert_equals([],cluster1.getIndices())
+    introcs.assert_false(cluster1.hasIndex(1))
+
+    # Many points (and duplicates) after clearing
+    for i in range(40):
+        dset.addPoint([0.0,0.0,float(i)])
+    for i in range(41,-1,-1):
+        cluster1.addIndex(i)
+        cluster1.addIndex(41)
+    introcs.assert_equals(list(range(41,-1,-1)),cluster1.getIndices())
+
+    # The indices are a live (read-only) view, and print like a list
+    cluster2 = a6cluster.Cluster(dset, point)
+    indices = cluster2.getIndices()
+    cluster2.addIndex(3)
+    cluster2.addIndex(1)
+    introcs.assert_equals([3,1],indices)
+    introcs.assert_true(indices is cluster2.getIndices())
+    introcs.assert_true(1 in indices)
+    introcs.assert_false(2 in indices)
+    introcs.assert_equals(1,indices[-1])
+    introcs.assert_equals(str(point)+':[3, 1]',str(cluster2))
+    try:
+        indices.append(4)
+        introcs.quit_with_error('Cluster.getIndices returned a writeable list')
+    except AttributeError:
+        pass
+
+    # The bitmap is only made when the first point is added
+    cluster2 = a6cluster.Cluster(dset, point)
+    introcs.assert_equals(None,cluster2._bitmap)
+    introcs.assert_false(cluster2.hasIndex(1))
+    cluster2.clear()
+    introcs.assert_equals(None,cluster2._bitmap)
+    cluster2.removeIndex(1)
+    cluster2.addIndex(1)
+    introcs.assert_true(cluster2.hasIndex(1))
 
     print('    Method Cluster.clear look okay')
     print('  Part A of class Cluster appears correct')
@@ -239,8 +608,37 @@ def test_cluster_b():
     # TEST CASE 3 (distance)
     dist = cluster3.distance([0.5,0.0,0.5])
     introcs.assert_floats_equal(0.5,dist)
+
+    # TEST CASE 4 (squared distance)
+    dist = cluster2.distance([1.0,0.0,-1.0],squared=True)
+    introcs.assert_floats_equal(1.5,dist)
     print('    Method Cluster.distance() looks okay')
 
+    # TEST CASE 1 (distances)
+    dists = cluster2.distances([[1.0,0.0,-1.0],[0.5,0.5,0.0],[0.0,0.0,0.0]])
+    introcs.assert_float_lists_equal([1.22474487139,0.0,0.7071068],dists.tolist())
+
+    # TEST CASE 2 (distances, squared, on a dataset view)
+    dists = cluster3.distances(dset.getContents(view=True),squared=True)
+    introcs.assert_float_lists_equal([1.25,1.25,0.25,0.25],dists.tolist())
+    print('    Method Cluster.distances() looks okay')
+
+    # TEST CASE 1 (nearest_centroids): ties go to the first centroid
+    rows = dset.getContents(view=True)
+    cents = numpy.array([[0.0,0.0,0.2],[0.5,0.5,0.0],[0.0,0.0,0.2]])
+    labels, dists = a6cluster.nearest_centroids(rows,cents)
+    introcs.assert_equals([1,1,0,0],labels.tolist())
+    introcs.assert_float_lists_equal([0.5,0.5,0.04,0.64],dists.tolist())
+
+    # TEST CASE 2 (nearest_centroids agrees with exact_distances)
+    rows = numpy.array([[float(x % 7),float(x % 5)] for x in range(100)])
+    cents = numpy.array([[1.0,1.0],[5.0,3.0],[3.0,1.0],[1.0,3.0]])
+    exact = a6cluster.exact_distances(rows,cents)
+    labels, dists = a6cluster.nearest_centroids(rows,cents,a6cluster.row_norms(rows))
+    introcs.assert_equals(exact.argmin(axis=1).tolist(),labels.tolist())
+    introcs.assert_float_lists_equal(exact.min(axis=1).tolist(),dists.tolist())
+    print('    Function nearest_centroids() looks okay')
+
     # Add some indices
     cluster1.addIndex(0)
     cluster1.addIndex(1)
@@ -261,6 +659,14 @@ def test_cluster_b():
     # TEST CASE 3 (radius)
     rads = cluster3.getRadius()
     introcs.assert_floats_equal(1.1180340,rads)
+
+    # TEST CASE 4 (radius): the cached radius follows the cluster
+    cluster1.update()
+    introcs.assert_floats_equal(0.7071068,cluster1.getRadius())
+    cluster1.addIndex(3)
+    introcs.assert_floats_equal(1.2247449,cluster1.getRadius())
+    cluster1.clear()
+    introcs.assert_floats_equal(0.0,cluster1.getRadius())
     print('    Method Cluster.getRadius() looks okay')
 
     # TEST CASE 1 (updateCentroid): centroid remains the same
@@ -279,7 +685,43 @@ def test_cluster_b():
     assert_points_equal([0.25, 0.25, 0.25], cluster2.getCentroid())
     introcs.assert_true(stable)
 
+    # TEST CASE 3 (updateCentroid): after removing points
+    cluster2.removeIndex(3)
+    cluster2.removeIndex(3)
+    introcs.assert_equals([0,1,2],cluster2.getIndices())
+    introcs.assert_false(cluster2.hasIndex(3))
+    stable = cluster2.update()
+    assert_points_equal([1./3, 1./3, 0.0], cluster2.getCentroid())
+    introcs.assert_false(stable)
+    cluster2.clear()
+    cluster2.addIndex(3)
+    cluster2.update()
+    assert_points_equal([0.0, 0.0, 1.0], cluster2.getCentroid())
+
     print('    Method Cluster.update() looks okay')
+
+    # TEST CASE 1 (stats)
+    cluster3.update()
+    stats = cluster3.stats()
+    introcs.assert_equals(3,stats['size'])
+    introcs.assert_floats_equal(4./3,stats['sse'])
+    introcs.assert_floats_equal(0.7453560,stats['radius'])
+    introcs.assert_float_lists_equal([2./9,2./9,0.0],stats['variance'])
+
+    # Without the radius, nothing is measured even after the centroid moves
+    cluster3._centroid = [0.0,0.0,0.0]
+    stats = cluster3.stats(False)
+    introcs.assert_false('radius' in stats)
+    expect = sum(sum(x*x for x in point) for point in cluster3.getContents())
+    introcs.assert_floats_equal(expect,stats['sse'])
+    introcs.assert_true(cluster3._radius is None or cluster3._radius[0] is not cluster3._centroid)
+
+    # TEST CASE 2 (stats of an empty cluster)
+    cluster2.clear()
+    stats = cluster2.stats()
+    introcs.assert_equals(0,stats['size'])
+    introcs.assert_floats_equal(0.0,stats['sse'])
+    print('    Method Cluster.stats() looks okay')
     print('  Part B of class Cluster appears correct')
     print()
 
@@ -386,6 +828,25 @@ def test_algorithm_b():
 
     nearest = km2._nearest([1.,10.])
     introcs.assert_true(nearest is km2.getClusters()[2])
+
+    # An exact tie on a grid goes to the first cluster
+    grid = a6dataset.Dataset(2, [[0.,0.], [2.,0.], [1.,0.]])
+    km3 = a6algorithm.Algorithm(grid, 2, [0,1])
+    introcs.assert_true(km3._nearest([1.,0.]) is km3.getClusters()[0])
+    km3._partition()
+    introcs.assert_equals(0, km3.getLabels()[2])
+
+    # The distances are compared (as they always were), not their squares. These
+    # squares differ in the last bit, but the distances are equal, so it is a tie
+    grid = a6dataset.Dataset(2, [[0.0,0.3], [0.3,0.2], [0.3,0.7]])
+    for mode in a6algorithm.MODES:
+        km3 = a6algorithm.Algorithm(grid, 2, [0,1], mode=mode)
+        first, second = km3.getClusters()
+        introcs.assert_equals(first.distance([0.3,0.7]), second.distance([0.3,0.7]))
+        introcs.assert_true(second.distance([0.3,0.7], True) < first.distance([0.3,0.7], True))
+        introcs.assert_true(km3._nearest([0.3,0.7]) is first)
+        km3._partition()
+        introcs.assert_equals(0, km3.getLabels()[2])
     print('    Method Algorithm._nearest() looks okay')
 
     # Testing partition()
@@ -406,6 +867,24 @@ def test_algorithm_b():
     introcs.assert_equals(set([2,3]), set(km1.getClusters()[0].getIndices()))
     introcs.assert_equals(set([0,1]), set(km1.getClusters()[1].getIndices()))
 
+    # The partition is a single array of labels, which the clusters view
+    introcs.assert_equals([1,1,0,0], km1.getLabels().tolist())
+    introcs.assert_true(km1.getClusters()[0].hasIndex(3))
+    introcs.assert_false(km1.getClusters()[0].hasIndex(1))
+    introcs.assert_equals([[10.,10.],[0.,9.]], km1.getClusters()[0].getContents())
+    introcs.assert_equals(None, a6algorithm.Algorithm(dset, 2, [0,2]).getLabels())
+
+    # Changing a view gives it its own indices, and leaves the others alone
+    km1.getClusters()[0].addIndex(0)
+    introcs.assert_equals([2,3,0], km1.getClusters()[0].getIndices())
+    introcs.assert_equals([0,1], km1.getClusters()[1].getIndices())
+    km1.getClusters()[0].removeIndex(2)
+    introcs.assert_equals([3,0], km1.getClusters()[0].getIndices())
+    introcs.assert_false(km1.getClusters()[0].hasIndex(2))
+    km1.getClusters()[1].clear()
+    introcs.assert_equals([], km1.getClusters()[1].getIndices())
+    introcs.assert_equals([1,1,0,0], km1.getLabels().tolist())
+
     # Try it on a file
     index1 = [2, 3, 5, 9, 11, 15, 16, 18, 19, 20, 22, 23, 29, 30, 32, 33, 37, 40, 41, 42,
               44, 45, 50, 60, 61, 62, 64, 69, 71, 73, 75, 76, 78, 80, 85, 88, 90, 94, 97]
@@ -422,6 +901,39 @@ def test_algorithm_b():
     introcs.assert_equals(set(index2), set(km3.getClusters()[1].getIndices()))
     introcs.assert_equals(set(index3), set(km3.getClusters()[2].getIndices()))
 
+    # The same partition, one point at a time
+    km4 = a6algorithm.Algorithm(data, 3, [23, 54, 36], max_memory=1)
+    km4._partition()
+    introcs.assert_equals(km3.getLabels().tolist(), km4.getLabels().tolist())
+
+    # The memory bound does not change the sums, so a whole run gives the same
+    # clusters (this grid data has many close calls)
+    rng = numpy.random.default_rng(1)
+    grid = a6dataset.Dataset(2, numpy.round(rng.random((1682, 2))*10)/10)
+    km5 = a6algorithm.Algorithm(grid, 154, list(range(154)))
+    km6 = a6algorithm.Algorithm(grid, 154, list(range(154)), max_memory=1018746)
+    km5.run(30)
+    km6.run(30)
+    introcs.assert_equals(km5.getLabels().tolist(), km6.getLabels().tolist())
+    for clust5, clust6 in zip(km5.getClusters(), km6.getClusters()):
+        introcs.assert_equals(clust5.getCentroid(), clust6.getCentroid())
+
+    # _partition labels every point like _nearest, even the close calls, which
+    # are common on grid data in more dimensions
+    for seed in range(10):
+        rng = numpy.random.default_rng(seed)
+        grid = a6dataset.Dataset(5, numpy.round(rng.random((200, 5))*10)/10)
+        km7 = a6algorithm.Algorithm(grid, 8, init='random', rng=seed)
+        for step in range(3):
+            km7._partition()
+            labels = km7.getLabels().tolist()
+            for i in range(grid.getSize()):
+                introcs.assert_true(km7._nearest(grid.getPoint(i)) is km7.getClusters()[labels[i]])
+            km7._update()
+    km8 = a6algorithm.Algorithm(data, 7, init='random', rng=276)
+    km8._partition()
+    introcs.assert_true(km8._nearest(data.getPoint(28)) is km8.getClusters()[km8.getLabels()[28]])
+
     print('    Method Algorithm._partition() looks okay')
     print('  Part B of class Algorithm appears correct')
     print()
@@ -451,6 +963,10 @@ def test_algorithm_c():
 
     print('    Method Algorithm._update() looks okay')
 
+    # Test inertia() (about the updated centroids)
+    introcs.assert_floats_equal(81.0,km1.inertia())
+    print('    Method Algorithm.inertia() looks okay')
+
     # Now test the k-means process itself.
 
     # FOR ALL TEST CASES
@@ -660,6 +1176,238 @@ def test_algorithm_d():
     print()
 
 
+def assert_same_clusters(dset, k, seeds, mode, steps):
+    """
+    Checks that an Algorithm in the given mode makes the same clusters as 'lloyd'.
+
+    Both algorithms take the given number of steps, and the labels and centroids
+    are compared after each one. Returns the Algorithm in the given mode.
+    """
+    km1 = a6algorithm.Algorithm(dset, k, seeds)
+    km2 = a6algorithm.Algorithm(dset, k, seeds, mode=mode)
+    for step in range(steps):
+        km1._partition()
+        km2._partition()
+        introcs.assert_equals(km1.getLabels().tolist(), km2.getLabels().tolist())
+        km1._update()
+        km2._update()
+        for j in range(k):
+            assert_points_equal(km1.getClusters()[j].getCentroid(),km2.getClusters()[j].getCentroid())
+    return km2
+
+
+def test_algorithm_modes():
+    """
+    Tests the accelerated modes of the Algorithm class.
+    """
+    print('  Testing the modes of class Algorithm')
+    file = os.path.join(os.path.split(__file__)[0],TEST_FILE)
+    data = a6dataset.Dataset(4, tools.data_for_file(file))
+
+    # A grid has many ties, which must go to the first cluster
+    grid = a6dataset.Dataset(2, [[float(x % 7),float(x % 5)] for x in range(200)])
+    fine = a6dataset.Dataset(3, [[(x*37 % 101)/101.0,(x*59 % 103)/103.0,(x % 17)/17.0]
+                                 for x in range(3000)], dtype=numpy.float32)
+
+    # The kd-tree splits the points into leaves, and reorders (but keeps) them
+    tree = a6kdtree.KDTree(fine, 16)
+    introcs.assert_equals(3000, tree.getSize())
+    introcs.assert_equals(list(range(3000)), sorted(tree._order.tolist()))
+    introcs.assert_true(tree.getNodes() >= 2*3000//16 - 1)
+    cents = numpy.array([[0.,0.,0.],[1.,1.,1.],[0.5,0.5,0.5]], dtype=numpy.float32)
+    labels = numpy.zeros(3000, dtype=int)
+    count = tree.filter(cents, labels)
+    exact = a6cluster.exact_distances(fine.getContents(view=True), cents)
+    introcs.assert_equals(exact.argmin(axis=1).tolist(), labels.tolist())
+    introcs.assert_true(count < 3000*3)
+
+    # In many dimensions, the kd-tree mode falls back to Lloyd
+    wide = a6dataset.Dataset(11, [[float((x*i) % 13) for i in range(11)] for x in range(50)])
+    km = a6algorithm.Algorithm(wide, 4, [0, 1, 2, 3], mode='kdtree')
+    introcs.assert_equals('lloyd', km._mode)
+    km.run(5)
+    introcs.assert_equals(None, km._engine)
+
+    for mode in a6algorithm.MODES:
+        km = assert_same_clusters(data, 3, [23, 54, 36], mode, 10)
+        km = assert_same_clusters(grid, 6, [0, 1, 2, 3, 4, 5], mode, 5)
+        km = assert_same_clusters(fine, 30, list(range(0, 3000, 100)), mode, 8)
+        km = assert_same_clusters(fine, 12, list(range(0, 1200, 100)), mode, 10)
+        if mode != 'lloyd':
+            # The bounds skip most of the distances after the first step
+            introcs.assert_true(km._engine.getCount() < 3000*12*10 // 2)
+        print('    Mode '+repr(mode)+' looks okay')
+
+    # The group bounds of Yinyang skip most of each step after the first
+    seeds = list(range(0, 3000, 50))
+    km1 = a6algorithm.Algorithm(fine, 60, seeds)
+    km2 = a6algorithm.Algorithm(fine, 60, seeds, mode='yinyang')
+    for step in range(8):
+        km1.step()
+        before = km2._engine.getCount() if km2._engine else 0
+        km2.step()
+        introcs.assert_equals(km1.getLabels().tolist(), km2.getLabels().tolist())
+        if step > 0:
+            introcs.assert_true(km2._engine.getCount()-before < 3000*60 // 2)
+    introcs.assert_equals(6, len(km2._engine._members))
+    introcs.assert_true(km2._engine.getCount() < 3000*60*8 // 3)
+    print('    The groups of mode \'yinyang\' look okay')
+
+    # Hamerly loosens its bounds by how far the centroids moved, however they move
+    seeds = list(range(0, 1200, 100))
+    km1 = a6algorithm.Algorithm(fine, 12, seeds)
+    km2 = a6algorithm.Algorithm(fine, 12, seeds, mode='hamerly')
+    km1._partition()
+    km2._partition()
+    old = km2.getLabels().tolist()
+    before = km2._engine.getCount()
+    introcs.assert_equals(3000*12, before)
+    for j in range(12):
+        moved = [x + 0.01*(j % 3) - 0.02*(j % 2) for x in km1.getClusters()[j].getCentroid()]
+        if j == 5:
+            moved = [0.5, 0.5, 0.5]   # One centroid jumps across the data
+        km1.getClusters()[j]._centroid = moved
+        km2.getClusters()[j]._centroid = list(moved)
+    km1._partition()
+    km2._partition()
+    introcs.assert_equals(km1.getLabels().tolist(), km2.getLabels().tolist())
+    introcs.assert_not_equals(old, km2.getLabels().tolist())
+    introcs.assert_true(km2._engine.getCount()-before < 3000*12)
+    print('    The bounds of mode \'hamerly\' look okay')
+
+    print('  The modes of class Algorithm appear correct')
+    print()
+
+
+def test_algorithm_minibatch():
+    """
+    Tests the mini-batch mode of the Algorithm class.
+    """
+    print('  Testing mini-batch k-means in class Algorithm')
+    file = os.path.join(os.path.split(__file__)[0],TEST_FILE)
+    data = a6dataset.Dataset(4, tools.data_for_file(file))
+    km1 = a6algorithm.Algorithm(data, 3, [23, 54, 36])
+    km1.run(20)
+
+    km2 = a6algorithm.Algorithm(data, 3, [23, 54, 36], rng=3)
+    steps = km2.run_minibatch(20, 100)
+    introcs.assert_true(0 < steps < 100)   # Stops once the objective settles
+    introcs.assert_true(km2.inertia() < 1.1*km1.inertia())
+
+    # The clusters hold the points nearest their centroids
+    cents = numpy.array([clust.getCentroid() for clust in km2.getClusters()])
+    exact = a6cluster.exact_distances(data.getContents(view=True), cents)
+    introcs.assert_equals(exact.argmin(axis=1).tolist(), km2.getLabels().tolist())
+
+    # No steps leaves the centroids alone
+    km3 = a6algorithm.Algorithm(data, 3, [23, 54, 36])
+    introcs.assert_equals(0, km3.run_minibatch(20, 0))
+    assert_points_equal([0.38, 0.94, 0.53, 0.07], km3.getClusters()[0].getCentroid())
+    print('    Method Algorithm.run_minibatch looks okay')
+    print('  Mini-batch k-means in class Algorithm appears correct')
+    print()
+
+
+def test_algorithm_seeding():
+    """
+    Tests the ways of choosing seeds in the Algorithm class.
+    """
+    print('  Testing seeding in class Algorithm')
+    file = os.path.join(os.path.split(__file__)[0],TEST_FILE)
+    data = a6dataset.Dataset(4, tools.data_for_file(file))
+    items = data.getContents()
+
+    for init in a6algorithm.INITS:
+        # The same rng gives the same seeds
+        km1 = a6algorithm.Algorithm(data, 5, init=init, rng=7)
+        km2 = a6algorithm.Algorithm(data, 5, init=init, rng=numpy.random.default_rng(7))
+        cents = [clust.getCentroid() for clust in km1.getClusters()]
+        introcs.assert_equals(cents, [clust.getCentroid() for clust in km2.getClusters()])
+
+        # The seeds are distinct points of the dataset
+        for pos in range(len(cents)):
+            introcs.assert_true(cents[pos] in items)
+            introcs.assert_false(cents[pos] in cents[:pos])
+
+        # Explicit seeds win over init
+        km3 = a6algorithm.Algorithm(data, 3, [23, 54, 36], init=init, rng=7)
+        assert_points_equal([0.38, 0.94, 0.53, 0.07], km3.getClusters()[0].getCentroid())
+
+        # Every point is a seed when k is the size of the dataset
+        dset = a6dataset.Dataset(2, [[0.,0.], [0.,0.], [1.,1.], [5.,5.]])
+        km4 = a6algorithm.Algorithm(dset, 4, init=init, rng=1)
+        cents = sorted(clust.getCentroid() for clust in km4.getClusters())
+        introcs.assert_equals([[0.,0.], [0.,0.], [1.,1.], [5.,5.]], cents)
+        print('    Initialization '+repr(init)+' looks okay')
+
+    # D**2 sampling finds the three far apart groups almost every time
+    items = [[x+0.01*i, y] for x, y in ((0,0), (100,0), (0,100)) for i in range(10)]
+    dset = a6dataset.Dataset(2, items)
+    for init in ('k-means++', 'k-means||'):
+        spread = 0
+        for seed in range(20):
+            km = a6algorithm.Algorithm(dset, 3, init=init, rng=seed)
+            corners = set((round(c.getCentroid()[0], -1), c.getCentroid()[1])
+                          for c in km.getClusters())
+            spread += len(corners) == 3
+        introcs.assert_true(spread >= 18)
+    print('  Seeding in class Algorithm appears correct')
+    print()
+
+
+def test_algorithm_convergence():
+    """
+    Tests the convergence checks of the Algorithm class.
+    """
+    print('  Testing convergence in class Algorithm')
+    items = [[0.5,0.5,0.5],[0.5,0.6,0.6],[0.6,0.5,0.6],[0.5,0.6,0.5],[0.5,0.4,0.5],[0.5,0.4,0.4]]
+    dset = a6dataset.Dataset(3,items)
+
+    # Every cluster counts, not just the last one
+    km1 = a6algorithm.Algorithm(dset, 2, [1, 3])
+    introcs.assert_equals(None, km1.getChanged())
+    introcs.assert_equals(None, km1.getShift())
+    km1._partition()
+    km1.getClusters()[1].update()
+    introcs.assert_false(km1._update())
+
+    # The steps report convergence, and the changes along the way
+    km2 = a6algorithm.Algorithm(dset, 2, [1, 3])
+    introcs.assert_false(km2.step())
+    introcs.assert_equals(6, km2.getChanged())
+    introcs.assert_false(km2.step())
+    introcs.assert_equals(1, km2.getChanged())
+    introcs.assert_true(km2.step())
+    introcs.assert_equals(0, km2.getChanged())
+    introcs.assert_floats_equal(0.0, km2.getShift())
+    print('    Method Algorithm.step looks okay')
+
+    # run stops at convergence, and returns the steps used
+    km3 = a6algorithm.Algorithm(dset, 2, [1, 3])
+    introcs.assert_equals(3, km3.run(10))
+    assert_points_equal([8./15, 17./30, 17./30], km3.getClusters()[0].getCentroid())
+    introcs.assert_equals(1, km3.run(10))  # Already converged
+    introcs.assert_equals(0, km3.run(0))
+    km4 = a6algorithm.Algorithm(dset, 2, [1, 3])
+    introcs.assert_equals(2, km4.run(2))
+
+    # A loose tolerance stops earlier, once the centroids move only a little
+    file = os.path.join(os.path.split(__file__)[0],TEST_FILE)
+    data = a6dataset.Dataset(4, tools.data_for_file(file))
+    km5 = a6algorithm.Algorithm(data, 3, [23, 54, 36])
+    steps = km5.run(50)
+    introcs.assert_true(steps < 50)
+    km6 = a6algorithm.Algorithm(data, 3, [23, 54, 36], tol=0.05)
+    loose = km6.run(50)
+    introcs.assert_true(loose < steps)
+    introcs.assert_true(km6.getShift() <= 0.05)
+    km7 = a6algorithm.Algorithm(data, 3, [23, 54, 36], tol=0)
+    introcs.assert_equals(steps, km7.run(50))
+    print('    Method Algorithm.run looks okay')
+    print('  Convergence in class Algorithm appears correct')
+    print()
+
+
 def test_all():
     """
     Invokes all tests
@@ -667,8 +1415,16 @@ def test_all():
     print('Starting unit test\n')
     test_point()
     test_point_list()
+    test_point_table()
     test_dataset_a()
     test_dataset_b()
+    test_dataset_c()
+    test_dataset_d()
+    test_dataset_subsets()
+    test_dataset_mapped()
+    test_dataset_files()
+    test_dataset_dtype()
+    test_load_csv()
     test_cluster_a()
     test_cluster_b()
     test_valid_seeds()
@@ -676,6 +1432,10 @@ def test_all():
     test_algorithm_b()
     test_algorithm_c()
     test_algorithm_d()
+    test_algorithm_modes()
+    test_algorithm_minibatch()
+    test_algorithm_seeding()
+    test_algorithm_convergence()
     print('All test cases passed!')
 
 